@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -6,6 +7,39 @@ DB_PATH = DATA_DIR / "app.db"
 IMAGES_DIR = DATA_DIR / "images"
 PDF_OUTPUT_DIR = DATA_DIR / "pdf_output"
 
+# Long-lived SQLite connections shared by request threads and jobs.
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "8"))
+
+# Number of worker processes used to extract chapter PDFs in parallel.
+EXTRACTION_WORKERS = int(os.environ.get("EXTRACTION_WORKERS", "0")) or (os.cpu_count() or 1)
+
+# PDFs longer than this many pages are split into page ranges and
+# extracted on several worker processes.
+PAGE_SHARD_SIZE = 40
+
+# Number of worker processes used to lay out batch PDFs per student.
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", "0")) or (os.cpu_count() or 1)
+
+# Maximum number of background PDF jobs rendering at once; further
+# submissions wait in the queue.
+PDF_JOB_WORKERS = int(os.environ.get("PDF_JOB_WORKERS", "2"))
+
+# Problem images are resampled to this resolution at column width before
+# being embedded in PDFs; sharper sources are downsampled once and cached.
+PRINT_DPI = int(os.environ.get("PRINT_DPI", "300"))
+
+# Parsed image data kept in memory (per process) across PDF generations;
+# least recently used entries are dropped once it grows past this size.
+PDF_IMAGE_CACHE_BYTES = 64 * 1024 * 1024
+
+# Generated PDFs are kept as a cache; least recently used files are
+# evicted once PDF_OUTPUT_DIR grows past this size.
+PDF_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+# Seconds between background integrity sweeps of the whole library;
+# 0 disables them (health endpoints then check on demand).
+INTEGRITY_SWEEP_SECONDS = int(os.environ.get("INTEGRITY_SWEEP_SECONDS", str(6 * 3600)))
+
 DATA_DIR.mkdir(exist_ok=True)
 IMAGES_DIR.mkdir(exist_ok=True)
 PDF_OUTPUT_DIR.mkdir(exist_ok=True)
@@ -1,13 +1,43 @@
+import asyncio
+import functools
+import logging
+import os
+import queue
 import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
-from typing import Generator
+from typing import Callable, Generator, TypeVar
 
-from backend.config import DB_PATH
+from backend.config import DB_PATH, DB_POOL_SIZE
 
-_TABLES_SQL = """
-PRAGMA foreign_keys = ON;
-PRAGMA journal_mode = WAL;
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Seconds get_db() waits for a free pooled connection before giving up
+POOL_TIMEOUT = 30.0
+# Waits longer than this are logged
+SLOW_WAIT_SECONDS = 0.5
+# Prepared statements cached per connection
+STATEMENT_CACHE_SIZE = 256
 
+# Applied once when a pooled connection is opened
+_CONNECTION_PRAGMAS = (
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA journal_mode = WAL",
+    # Safe with WAL: a power loss can drop the last commits but not corrupt
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -16384",  # KiB, i.e. 16 MiB per connection
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",
+)
+
+# Schema as of the first versioned release. Later changes go in
+# _MIGRATIONS instead of being edited in here.
+_TABLES_SQL = """
 CREATE TABLE IF NOT EXISTS problem_sets (
     id          INTEGER PRIMARY KEY AUTOINCREMENT,
     name        TEXT NOT NULL UNIQUE,
@@ -23,6 +53,9 @@ CREATE TABLE IF NOT EXISTS chapters (
     source_filename TEXT NOT NULL,
     sort_order      INTEGER NOT NULL DEFAULT 0,
     total_problems  INTEGER NOT NULL DEFAULT 0,
+    source_size     INTEGER,
+    source_mtime    REAL,
+    source_hash     TEXT,
     created_at      TEXT NOT NULL DEFAULT (datetime('now')),
     UNIQUE(problem_set_id, name)
 );
@@ -40,6 +73,8 @@ CREATE TABLE IF NOT EXISTS problems (
     UNIQUE(chapter_id, number)
 );
 
+CREATE INDEX IF NOT EXISTS idx_problems_image_path ON problems(image_path);
+
 CREATE TABLE IF NOT EXISTS students (
     id          INTEGER PRIMARY KEY AUTOINCREMENT,
     name        TEXT NOT NULL,
@@ -65,6 +100,19 @@ CREATE TABLE IF NOT EXISTS wrong_answers (
     UNIQUE(wrong_answer_set_id, chapter_id)
 );
 
+-- One row per wrong problem; the source of truth for which problems a
+-- set contains. wrong_answers.problem_numbers is still written for older
+-- builds reading the same database.
+CREATE TABLE IF NOT EXISTS wrong_answer_items (
+    wrong_answer_set_id INTEGER NOT NULL REFERENCES wrong_answer_sets(id) ON DELETE CASCADE,
+    chapter_id          INTEGER NOT NULL REFERENCES chapters(id) ON DELETE CASCADE,
+    number              INTEGER NOT NULL,
+    PRIMARY KEY (wrong_answer_set_id, chapter_id, number)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_wrong_answer_items_problem
+    ON wrong_answer_items(chapter_id, number, wrong_answer_set_id);
+
 CREATE TABLE IF NOT EXISTS settings (
     key   TEXT PRIMARY KEY,
     value TEXT NOT NULL
@@ -75,36 +123,430 @@ CREATE TABLE IF NOT EXISTS creation_history (
     title           TEXT NOT NULL,
     problem_set_id  INTEGER NOT NULL REFERENCES problem_sets(id) ON DELETE CASCADE,
     input_data      TEXT NOT NULL,
+    total_problems  INTEGER,
+    student_count   INTEGER,
     created_at      TEXT NOT NULL DEFAULT (datetime('now'))
 );
 """
 
+# Columns added before schema versioning; ALTERed into older databases.
+_ADDED_COLUMNS = {
+    "chapters": {
+        "source_size": "INTEGER",
+        "source_mtime": "REAL",
+        "source_hash": "TEXT",
+    },
+    "creation_history": {
+        "total_problems": "INTEGER",
+        "student_count": "INTEGER",
+    },
+}
+
+
+def _add_missing_columns(conn: sqlite3.Connection) -> None:
+    for table, columns in _ADDED_COLUMNS.items():
+        existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for name, decl in columns.items():
+            if name not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+
+
+def _backfill_derived_rows(conn: sqlite3.Connection) -> None:
+    """Fill tables derived from JSON columns for rows written by older builds."""
+    conn.execute(
+        """INSERT OR IGNORE INTO wrong_answer_items (wrong_answer_set_id, chapter_id, number)
+           SELECT wa.wrong_answer_set_id, wa.chapter_id, n.value
+           FROM wrong_answers wa, json_each(wa.problem_numbers) n
+           WHERE NOT EXISTS (
+               SELECT 1 FROM wrong_answer_items i
+               WHERE i.wrong_answer_set_id = wa.wrong_answer_set_id
+                 AND i.chapter_id = wa.chapter_id
+           )"""
+    )
+    conn.execute(
+        """UPDATE creation_history SET
+               total_problems = COALESCE(
+                   (SELECT SUM(json_array_length(e.value, '$.problem_numbers'))
+                    FROM json_each(input_data, '$.student_entries') se,
+                         json_each(se.value, '$.entries') e),
+                   (SELECT SUM(json_array_length(e.value, '$.problem_numbers'))
+                    FROM json_each(input_data, '$.entries') e),
+                   0),
+               student_count = CASE
+                   WHEN json_array_length(input_data, '$.student_entries') > 0
+                   THEN json_array_length(input_data, '$.student_entries')
+                   ELSE COALESCE(json_array_length(input_data, '$.student_ids'), 0)
+               END
+           WHERE total_problems IS NULL"""
+    )
+
+
+def _execute_script(conn: sqlite3.Connection, script: str) -> None:
+    """Run statements one by one; executescript() would commit mid-migration."""
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            conn.execute(statement)
+            statement = ""
+
+
+def _migrate_baseline(conn: sqlite3.Connection) -> None:
+    """Create the tables, or bring a database from before versioning up to them."""
+    _execute_script(conn, _TABLES_SQL)
+    _add_missing_columns(conn)
+    _backfill_derived_rows(conn)
+
+
+def _migrate_lookup_indexes(conn: sqlite3.Connection) -> None:
+    """Index the columns list, delete and cleanup queries filter on."""
+    _execute_script(conn, """
+        CREATE INDEX IF NOT EXISTS idx_chapters_problem_set
+            ON chapters(problem_set_id, sort_order);
+        CREATE INDEX IF NOT EXISTS idx_wrong_answer_sets_student
+            ON wrong_answer_sets(student_id, created_at);
+        CREATE INDEX IF NOT EXISTS idx_wrong_answer_sets_created
+            ON wrong_answer_sets(created_at);
+        CREATE INDEX IF NOT EXISTS idx_wrong_answers_chapter
+            ON wrong_answers(chapter_id);
+        CREATE INDEX IF NOT EXISTS idx_creation_history_created
+            ON creation_history(created_at);
+        CREATE INDEX IF NOT EXISTS idx_creation_history_problem_set
+            ON creation_history(problem_set_id);
+    """)
+
+
+def _migrate_maintained_counts(conn: sqlite3.Connection) -> None:
+    """Keep problem and chapter counts on their parent rows via triggers.
+
+    chapters.total_problems follows inserts and deletes of problems, and
+    problem_sets.chapter_count/total_problems follow their chapters, so
+    list and detail pages read stored numbers instead of aggregating.
+    chapters.missing_images holds the result of the last integrity check.
+    """
+    conn.execute(
+        "ALTER TABLE problem_sets ADD COLUMN chapter_count INTEGER NOT NULL DEFAULT 0"
+    )
+    conn.execute(
+        "ALTER TABLE problem_sets ADD COLUMN total_problems INTEGER NOT NULL DEFAULT 0"
+    )
+    conn.execute(
+        "ALTER TABLE chapters ADD COLUMN missing_images INTEGER NOT NULL DEFAULT 0"
+    )
+    _execute_script(conn, """
+        UPDATE chapters SET total_problems =
+            (SELECT COUNT(*) FROM problems p WHERE p.chapter_id = chapters.id);
+        UPDATE problem_sets SET
+            chapter_count =
+                (SELECT COUNT(*) FROM chapters c WHERE c.problem_set_id = problem_sets.id),
+            total_problems =
+                (SELECT COALESCE(SUM(c.total_problems), 0) FROM chapters c
+                 WHERE c.problem_set_id = problem_sets.id);
+
+        CREATE TRIGGER trg_problems_insert AFTER INSERT ON problems BEGIN
+            UPDATE chapters SET total_problems = total_problems + 1
+            WHERE id = NEW.chapter_id;
+        END;
+        CREATE TRIGGER trg_problems_delete AFTER DELETE ON problems BEGIN
+            UPDATE chapters SET total_problems = total_problems - 1
+            WHERE id = OLD.chapter_id;
+        END;
+        CREATE TRIGGER trg_problems_move AFTER UPDATE OF chapter_id ON problems
+        WHEN NEW.chapter_id != OLD.chapter_id BEGIN
+            UPDATE chapters SET total_problems = total_problems - 1
+            WHERE id = OLD.chapter_id;
+            UPDATE chapters SET total_problems = total_problems + 1
+            WHERE id = NEW.chapter_id;
+        END;
+
+        CREATE TRIGGER trg_chapters_insert AFTER INSERT ON chapters BEGIN
+            UPDATE problem_sets SET
+                chapter_count = chapter_count + 1,
+                total_problems = total_problems + NEW.total_problems
+            WHERE id = NEW.problem_set_id;
+        END;
+        CREATE TRIGGER trg_chapters_delete AFTER DELETE ON chapters BEGIN
+            UPDATE problem_sets SET
+                chapter_count = chapter_count - 1,
+                total_problems = total_problems - OLD.total_problems
+            WHERE id = OLD.problem_set_id;
+        END;
+        CREATE TRIGGER trg_chapters_total AFTER UPDATE OF total_problems ON chapters
+        WHEN NEW.total_problems != OLD.total_problems BEGIN
+            UPDATE problem_sets SET
+                total_problems = total_problems + NEW.total_problems - OLD.total_problems
+            WHERE id = NEW.problem_set_id;
+        END;
+    """)
+
+
+def _migrate_integrity_results(conn: sqlite3.Connection) -> None:
+    """Store integrity verdicts; a chapter's verdict is dropped when its problems change."""
+    _execute_script(conn, """
+        CREATE TABLE integrity_results (
+            chapter_id    INTEGER PRIMARY KEY REFERENCES chapters(id) ON DELETE CASCADE,
+            problem_count INTEGER NOT NULL,
+            image_count   INTEGER NOT NULL,
+            missing_files TEXT NOT NULL,
+            orphan_files  TEXT NOT NULL,
+            healthy       INTEGER NOT NULL,
+            checked_at    TEXT NOT NULL DEFAULT (datetime('now'))
+        );
+
+        CREATE TRIGGER trg_problems_insert_integrity AFTER INSERT ON problems BEGIN
+            DELETE FROM integrity_results WHERE chapter_id = NEW.chapter_id;
+        END;
+        CREATE TRIGGER trg_problems_delete_integrity AFTER DELETE ON problems BEGIN
+            DELETE FROM integrity_results WHERE chapter_id = OLD.chapter_id;
+        END;
+        CREATE TRIGGER trg_problems_update_integrity
+        AFTER UPDATE OF chapter_id, number, image_path, file_size ON problems BEGIN
+            DELETE FROM integrity_results WHERE chapter_id IN (OLD.chapter_id, NEW.chapter_id);
+        END;
+    """)
+
+
+def _migrate_problem_bbox(conn: sqlite3.Connection) -> None:
+    """Record where each problem's image sits on its page, for targeted repair."""
+    for column in ("bbox_x0", "bbox_y0", "bbox_x1", "bbox_y1"):
+        conn.execute(f"ALTER TABLE problems ADD COLUMN {column} REAL")
+
+
+# Migration N brings a database from user_version N-1 to N. Append only;
+# never edit or reorder a migration that has shipped.
+_MIGRATIONS: list[Callable[[sqlite3.Connection], None]] = [
+    _migrate_baseline,
+    _migrate_lookup_indexes,
+    _migrate_maintained_counts,
+    _migrate_integrity_results,
+    _migrate_problem_bbox,
+]
+
+
+def apply_migrations(conn: sqlite3.Connection) -> int:
+    """Apply pending migrations, each in its own transaction.
+
+    Returns the resulting schema version.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version > len(_MIGRATIONS):
+        raise RuntimeError(
+            f"Database schema version {version} is newer than this build "
+            f"supports ({len(_MIGRATIONS)})"
+        )
+
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None  # transactions are managed explicitly below
+    try:
+        for target in range(version + 1, len(_MIGRATIONS) + 1):
+            migrate = _MIGRATIONS[target - 1]
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                migrate(conn)
+                conn.execute(f"PRAGMA user_version = {target}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            logger.info("Applied schema migration %d (%s)", target, migrate.__name__)
+    finally:
+        conn.isolation_level = isolation_level
+    return len(_MIGRATIONS)
+
 
 def _create_connection() -> sqlite3.Connection:
-    conn = sqlite3.connect(str(DB_PATH), check_same_thread=False)
+    conn = sqlite3.connect(
+        str(DB_PATH),
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
     conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA foreign_keys = ON")
-    conn.execute("PRAGMA journal_mode = WAL")
+    for pragma in _CONNECTION_PRAGMAS:
+        conn.execute(pragma)
     return conn
 
 
+class _ConnectionPool:
+    """Fixed-size pool of long-lived connections shared across threads.
+
+    A connection is used by one thread at a time, between checkout and
+    return. A thread that already holds a connection never waits for
+    another one (a nested get_db() would deadlock a full pool); it gets a
+    short-lived overflow connection instead. A forked child process
+    starts with an empty pool instead of reusing connections inherited
+    from its parent.
+    """
+
+    def __init__(self, size: int) -> None:
+        self._size = size
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._overflow: set[int] = set()
+        self._created = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def acquire(self) -> sqlite3.Connection:
+        conn = self._checkout()
+        self._local.held = getattr(self._local, "held", 0) + 1
+        return conn
+
+    def _checkout(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            self._checkouts += 1
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            if self._created < self._size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+                overflow = getattr(self._local, "held", 0) > 0
+
+        if create:
+            try:
+                return _create_connection()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        if overflow:
+            conn = _create_connection()
+            with self._lock:
+                self._overflow.add(id(conn))
+            return conn
+
+        started = time.perf_counter()
+        try:
+            conn = self._idle.get(timeout=POOL_TIMEOUT)
+        except queue.Empty:
+            raise RuntimeError(
+                f"No database connection free after {POOL_TIMEOUT:.0f}s "
+                f"(pool size {self._size})"
+            ) from None
+        waited = time.perf_counter() - started
+
+        with self._lock:
+            self._waits += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        if waited > SLOW_WAIT_SECONDS:
+            logger.warning("Waited %.2fs for a database connection", waited)
+        return conn
+
+    def release(self, conn: sqlite3.Connection, broken: bool = False) -> None:
+        self._local.held -= 1
+        if self._pid != os.getpid():
+            return
+        with self._lock:
+            if id(conn) in self._overflow:
+                self._overflow.discard(id(conn))
+                conn.close()
+                return
+            if broken:
+                self._created -= 1
+        if broken:
+            conn.close()
+            return
+        self._idle.put(conn)
+
+    def close(self) -> None:
+        with self._lock:
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+                self._created -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": self._size,
+                "open": self._created,
+                "idle": self._idle.qsize(),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_total_ms": round(self._wait_total * 1000, 1),
+                "wait_max_ms": round(self._wait_max * 1000, 1),
+            }
+
+
+_pool = _ConnectionPool(DB_POOL_SIZE)
+# Runs blocking database work for coroutines; one thread per pooled connection
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
 @contextmanager
 def get_db() -> Generator[sqlite3.Connection, None, None]:
-    conn = _create_connection()
+    conn = _pool.acquire()
+    broken = False
     try:
         yield conn
         conn.commit()
     except Exception:
-        conn.rollback()
+        try:
+            conn.rollback()
+        except sqlite3.Error:
+            broken = True
         raise
     finally:
-        conn.close()
+        _pool.release(conn, broken)
+
+
+def pool_stats() -> dict:
+    """Return connection pool usage counters, including checkout wait time."""
+    return _pool.stats()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=DB_POOL_SIZE, thread_name_prefix="db"
+            )
+        return _executor
+
+
+async def run_db(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Run a blocking function that uses get_db() off the event loop.
+
+    For coroutines that need the database (background jobs, SSE
+    producers). Plain ``def`` endpoints are already run on FastAPI's
+    threadpool and call get_db() directly.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_executor(), functools.partial(fn, *args, **kwargs)
+    )
+
+
+def close_pool() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+    _pool.close()
 
 
 def init_db() -> None:
     conn = _create_connection()
     try:
-        conn.executescript(_TABLES_SQL)
-        conn.commit()
+        apply_migrations(conn)
     finally:
         conn.close()
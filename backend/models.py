@@ -1,3 +1,5 @@
+from typing import Annotated, Literal
+
 from pydantic import BaseModel, Field
 
 
@@ -158,17 +160,51 @@ class ExtractProgress(BaseModel):
 class PdfGenerateRequest(BaseModel):
     wrong_answer_set_id: int
     spacer_ratio: float = Field(default=1.0, ge=0.0, le=3.0)
+    # grayscale/mono shrink PDFs of mostly black-and-white problems
+    print_profile: Literal["color", "grayscale", "mono"] = "color"
+    # compact packs several chapters per page under inline headers
+    layout: Literal["standard", "compact"] = "standard"
 
 
 class PdfBatchRequest(BaseModel):
     wrong_answer_set_ids: list[int]
     spacer_ratio: float = Field(default=1.0, ge=0.0, le=3.0)
     include_dividers: bool = True
+    parallel: bool = True
+    print_profile: Literal["color", "grayscale", "mono"] = "color"
+    layout: Literal["standard", "compact"] = "standard"
+
+
+class PdfPlanRequest(BaseModel):
+    wrong_answer_set_ids: list[int] = Field(min_length=1)
+    spacer_ratios: list[Annotated[float, Field(ge=0.0, le=3.0)]] = Field(
+        default=[1.0], min_length=1, max_length=64
+    )
+    # False plans a single-set PDF (no divider pages)
+    include_dividers: bool = True
+    include_placements: bool = False
+    layout: Literal["standard", "compact"] = "standard"
 
 
 class PdfResponse(BaseModel):
     filename: str
     download_url: str
+    # Pages a compact layout saved over the standard one
+    pages_saved: int | None = None
+
+
+class PdfJobResponse(BaseModel):
+    job_id: str
+    total_students: int
+
+
+class PdfJobStatus(BaseModel):
+    job_id: str
+    status: str
+    students_done: int
+    total_students: int
+    filename: str | None = None
+    download_url: str | None = None
 
 
 # ---------------------------------------------------------------------------
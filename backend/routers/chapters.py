@@ -1,25 +1,35 @@
 from fastapi import APIRouter, HTTPException
 
 from backend.database import get_db
+from backend.services.image_store import image_url
 from backend.services.integrity import check_chapter_integrity, repair_chapter
 
 router = APIRouter(prefix="/api/chapters", tags=["chapters"])
 
 
 @router.get("/{chapter_id}/health")
-async def chapter_health(chapter_id: int):
-    """Check DB<->filesystem integrity for a chapter."""
-    result = check_chapter_integrity(chapter_id)
+def chapter_health(chapter_id: int, refresh: bool = False):
+    """DB<->filesystem integrity of a chapter, as of its last check.
+
+    Pass refresh=true to re-check now.
+    """
+    result = check_chapter_integrity(chapter_id, refresh=refresh)
     if "error" in result:
         raise HTTPException(status_code=404, detail=result["error"])
     return result
 
 
 @router.post("/{chapter_id}/repair")
-async def repair_chapter_endpoint(chapter_id: int):
-    """Re-extract a chapter from its source PDF to fix integrity issues."""
+def repair_chapter_endpoint(chapter_id: int, mode: str = "missing"):
+    """Re-extract a chapter from its source PDF to fix integrity issues.
+
+    mode=missing (default) re-extracts only missing images; mode=full
+    replaces every problem of the chapter.
+    """
+    if mode not in ("missing", "full"):
+        raise HTTPException(status_code=400, detail="mode는 missing 또는 full이어야 합니다.")
     try:
-        result = repair_chapter(chapter_id)
+        result = repair_chapter(chapter_id, mode=mode)
         return result
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -28,7 +38,7 @@ async def repair_chapter_endpoint(chapter_id: int):
 
 
 @router.get("/{chapter_id}/problems")
-async def list_chapter_problems(chapter_id: int):
+def list_chapter_problems(chapter_id: int):
     with get_db() as db:
         chapter = db.execute(
             "SELECT id, name, problem_set_id FROM chapters WHERE id = ?",
@@ -56,6 +66,7 @@ async def list_chapter_problems(chapter_id: int):
                 "id": p["id"],
                 "number": p["number"],
                 "image_path": p["image_path"],
+                "image_url": image_url(p["image_path"]),
                 "width": p["width"],
                 "height": p["height"],
                 "file_size": p["file_size"],
@@ -32,8 +32,23 @@ class CreateHistoryRequest(BaseModel):
     student_entries: list[StudentEntryInput] | None = None
 
 
+def _count_history(data: dict) -> tuple[int, int]:
+    """Return (total_problems, student_count) of a history input document."""
+    student_entries = data.get("student_entries", [])
+    if student_entries:
+        total = sum(
+            len(e["problem_numbers"])
+            for se in student_entries
+            for e in se.get("entries", [])
+        )
+        return total, len(student_entries)
+
+    total = sum(len(e["problem_numbers"]) for e in data.get("entries", []))
+    return total, len(data.get("student_ids", []))
+
+
 @router.post("")
-async def save_history(req: CreateHistoryRequest):
+def save_history(req: CreateHistoryRequest):
     _cleanup_old_entries()
 
     data_dict: dict = {}
@@ -63,64 +78,51 @@ async def save_history(req: CreateHistoryRequest):
         data_dict["student_ids"] = req.student_ids
 
     input_data = json.dumps(data_dict, ensure_ascii=False)
+    total_problems, student_count = _count_history(data_dict)
     with get_db() as db:
         cursor = db.execute(
-            "INSERT INTO creation_history (title, problem_set_id, input_data) VALUES (?, ?, ?)",
-            (req.title, req.problem_set_id, input_data),
+            "INSERT INTO creation_history "
+            "(title, problem_set_id, input_data, total_problems, student_count) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (req.title, req.problem_set_id, input_data, total_problems, student_count),
         )
         db.commit()
         return {"id": cursor.lastrowid, "status": "saved"}
 
 
 @router.get("")
-async def list_history():
+def list_history():
     _cleanup_old_entries()
     with get_db() as db:
         rows = db.execute(
             """SELECT h.id, h.title, h.problem_set_id, h.input_data, h.created_at,
+                      h.total_problems, h.student_count,
                       ps.name as problem_set_name
                FROM creation_history h
                LEFT JOIN problem_sets ps ON h.problem_set_id = ps.id
                ORDER BY h.created_at DESC"""
         ).fetchall()
+        name_map = {
+            r["id"]: r["name"]
+            for r in db.execute("SELECT id, name FROM problem_sets").fetchall()
+        }
 
     result = []
     for row in rows:
         data = json.loads(row["input_data"])
-
-        # Compute total problems and student count
         student_entries = data.get("student_entries", [])
-        if student_entries:
-            total = sum(
-                len(e["problem_numbers"])
-                for se in student_entries
-                for e in se.get("entries", [])
-            )
-            student_count = len(student_entries)
-        else:
-            total = sum(len(e["problem_numbers"]) for e in data.get("entries", []))
-            student_count = len(data.get("student_ids", []))
 
         # Resolve problem_set_ids to names
         ps_ids = data.get("problem_set_ids", [])
-        ps_names: list[str] = []
-        if ps_ids:
-            with get_db() as db2:
-                placeholders = ",".join("?" for _ in ps_ids)
-                name_rows = db2.execute(
-                    f"SELECT id, name FROM problem_sets WHERE id IN ({placeholders})",
-                    ps_ids,
-                ).fetchall()
-            name_map = {r["id"]: r["name"] for r in name_rows}
-            ps_names = [name_map.get(pid, "") for pid in ps_ids if name_map.get(pid)]
+        ps_names = [name_map[pid] for pid in ps_ids if name_map.get(pid)]
 
         item = {
             "id": row["id"],
             "title": row["title"],
             "problem_set_id": row["problem_set_id"],
             "problem_set_name": row["problem_set_name"],
-            "total_problems": total,
-            "student_count": student_count,
+            "total_problems": row["total_problems"],
+            "student_count": row["student_count"],
             "created_at": row["created_at"],
         }
 
@@ -141,7 +143,7 @@ async def list_history():
 
 
 @router.get("/{history_id}")
-async def get_history(history_id: int):
+def get_history(history_id: int):
     with get_db() as db:
         row = db.execute(
             """SELECT h.id, h.title, h.problem_set_id, h.input_data, h.created_at,
@@ -166,7 +168,7 @@ async def get_history(history_id: int):
 
 
 @router.delete("/{history_id}")
-async def delete_history(history_id: int):
+def delete_history(history_id: int):
     with get_db() as db:
         db.execute("DELETE FROM creation_history WHERE id = ?", (history_id,))
         db.commit()
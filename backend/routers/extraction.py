@@ -1,6 +1,8 @@
 import asyncio
 import json
+import sqlite3
 import uuid
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import AsyncGenerator
 
@@ -8,22 +10,31 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from sse_starlette.sse import EventSourceResponse
 
-from backend.config import IMAGES_DIR
-from backend.database import get_db
-from backend.services.extractor import extract_chapter
+from backend.config import EXTRACTION_WORKERS
+from backend.database import get_db, run_db
+from backend.services import pdf_cache
+from backend.services.extractor import extract_chapter_list
+from backend.services.image_store import release_images
+from backend.utils.fingerprint import file_fingerprint, is_unchanged
 
 router = APIRouter(prefix="/api/extract", tags=["extraction"])
 
 _jobs: dict[str, dict] = {}
+_process_pool: ProcessPoolExecutor | None = None
 
 
 class ExtractionRequest(BaseModel):
     folder_path: str
+    # Set to update an existing problem set: only new or changed PDFs are
+    # re-extracted and chapters whose PDF disappeared are dropped.
+    problem_set_id: int | None = None
 
 
 class ExtractionResponse(BaseModel):
     job_id: str
     problem_set_id: int
+    skipped_chapters: int = 0
+    removed_chapters: int = 0
 
 
 @router.post("", response_model=ExtractionResponse)
@@ -36,6 +47,38 @@ async def start_extraction(req: ExtractionRequest):
     if not pdf_files:
         raise HTTPException(status_code=400, detail="PDF 파일이 없습니다.")
 
+    skipped = removed = 0
+    if req.problem_set_id is None:
+        problem_set_id, chapters = await run_db(_create_problem_set, folder, pdf_files)
+    else:
+        problem_set_id = req.problem_set_id
+        chapters, skipped, removed = await run_db(
+            _plan_update, problem_set_id, folder, pdf_files
+        )
+
+    job_id = str(uuid.uuid4())
+    _jobs[job_id] = {
+        "status": "running",
+        "cancelled": False,
+        "problem_set_id": problem_set_id,
+        "chapters": chapters,
+        "futures": [],
+        "events": asyncio.Queue(),
+    }
+
+    asyncio.get_event_loop().create_task(
+        _run_extraction(job_id, problem_set_id, chapters)
+    )
+
+    return ExtractionResponse(
+        job_id=job_id,
+        problem_set_id=problem_set_id,
+        skipped_chapters=skipped,
+        removed_chapters=removed,
+    )
+
+
+def _create_problem_set(folder: Path, pdf_files: list[Path]) -> tuple[int, list[dict]]:
     problem_set_name = folder.name
 
     with get_db() as db:
@@ -57,110 +100,259 @@ async def start_extraction(req: ExtractionRequest):
                 "name": chapter_name,
                 "pdf_path": str(pdf_file),
                 "sort_order": sort_order,
+                "fingerprint": file_fingerprint(pdf_file),
             })
         db.commit()
 
-    job_id = str(uuid.uuid4())
-    _jobs[job_id] = {
-        "status": "running",
-        "cancelled": False,
-        "problem_set_id": problem_set_id,
-        "chapters": chapters,
-        "events": asyncio.Queue(),
-    }
+    return problem_set_id, chapters
 
-    asyncio.get_event_loop().create_task(
-        _run_extraction(job_id, problem_set_id, chapters)
-    )
 
-    return ExtractionResponse(job_id=job_id, problem_set_id=problem_set_id)
+def _plan_update(
+    problem_set_id: int, folder: Path, pdf_files: list[Path]
+) -> tuple[list[dict], int, int]:
+    """Diff a folder against an existing problem set.
+
+    Unchanged chapters are kept as-is, changed ones are queued for
+    extraction (their problems are replaced when it saves), new PDFs get
+    new chapters, and chapters whose PDF is gone are deleted.
+    Returns (chapters to extract, skipped count, removed count).
+    """
+    released_paths: list[str] = []
+
+    with get_db() as db:
+        ps = db.execute(
+            "SELECT id FROM problem_sets WHERE id = ?", (problem_set_id,)
+        ).fetchone()
+        if not ps:
+            raise HTTPException(status_code=404, detail="문제집을 찾을 수 없습니다.")
+
+        existing = {
+            row["source_filename"]: row
+            for row in db.execute(
+                "SELECT id, name, source_filename, source_size, source_mtime, source_hash "
+                "FROM chapters WHERE problem_set_id = ?",
+                (problem_set_id,),
+            ).fetchall()
+        }
+
+        # Chapters whose source PDF disappeared
+        current_names = {p.name for p in pdf_files}
+        gone = [row for name, row in existing.items() if name not in current_names]
+        for row in gone:
+            pdf_cache.invalidate_chapter(row["id"])
+            released_paths.extend(_delete_chapter_problems(db, row["id"]))
+            db.execute("DELETE FROM wrong_answers WHERE chapter_id = ?", (row["id"],))
+            db.execute("DELETE FROM chapters WHERE id = ?", (row["id"],))
+
+        chapters = []
+        skipped = 0
+        for sort_order, pdf_file in enumerate(pdf_files):
+            row = existing.get(pdf_file.name)
+
+            if row is None:
+                cursor = db.execute(
+                    "INSERT INTO chapters (problem_set_id, name, source_filename, sort_order) VALUES (?, ?, ?, ?)",
+                    (problem_set_id, pdf_file.stem, pdf_file.name, sort_order),
+                )
+                chapters.append({
+                    "id": cursor.lastrowid,
+                    "name": pdf_file.stem,
+                    "pdf_path": str(pdf_file),
+                    "sort_order": sort_order,
+                    "fingerprint": file_fingerprint(pdf_file),
+                })
+                continue
+
+            unchanged, fingerprint = is_unchanged(
+                pdf_file,
+                {
+                    "size": row["source_size"],
+                    "mtime": row["source_mtime"],
+                    "hash": row["source_hash"],
+                },
+            )
+            db.execute(
+                "UPDATE chapters SET sort_order = ? WHERE id = ?",
+                (sort_order, row["id"]),
+            )
+            if unchanged:
+                skipped += 1
+                if fingerprint is not None:
+                    # Same content, new mtime: remember it to skip hashing next time
+                    db.execute(
+                        "UPDATE chapters SET source_mtime = ? WHERE id = ?",
+                        (fingerprint["mtime"], row["id"]),
+                    )
+                continue
+
+            chapters.append({
+                "id": row["id"],
+                "name": row["name"],
+                "pdf_path": str(pdf_file),
+                "sort_order": sort_order,
+                "fingerprint": fingerprint,
+            })
+
+        db.execute(
+            "UPDATE problem_sets SET source_path = ?, updated_at = datetime('now') WHERE id = ?",
+            (str(folder), problem_set_id),
+        )
+        db.commit()
+
+    release_images(released_paths)
+    return chapters, skipped, len(gone)
+
+
+def _delete_chapter_problems(db: sqlite3.Connection, chapter_id: int) -> list[str]:
+    """Delete a chapter's problem rows and return their image paths."""
+    image_paths = [
+        row["image_path"]
+        for row in db.execute(
+            "SELECT image_path FROM problems WHERE chapter_id = ?", (chapter_id,)
+        ).fetchall()
+    ]
+    db.execute("DELETE FROM problems WHERE chapter_id = ?", (chapter_id,))
+    return image_paths
+
+
+def _save_chapter(chapter: dict, problems_data: list[dict]) -> int:
+    """Replace a chapter's problems and record its source fingerprint.
+
+    The old rows are deleted in the same transaction, so a re-extracted
+    chapter keeps its previous problems until the new ones are saved.
+    """
+    with get_db() as db:
+        old_image_paths = _delete_chapter_problems(db, chapter["id"])
+        db.executemany(
+            """INSERT INTO problems
+               (chapter_id, number, image_path, width, height, file_size, page_num, column_pos,
+                bbox_x0, bbox_y0, bbox_x1, bbox_y1)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            [
+                (
+                    chapter["id"],
+                    prob["number"],
+                    prob["image_path"],
+                    prob["width"],
+                    prob["height"],
+                    prob["file_size"],
+                    prob["page_num"],
+                    prob["column_pos"],
+                    *prob["bbox"],
+                )
+                for prob in problems_data
+            ],
+        )
+
+        fingerprint = chapter["fingerprint"]
+        db.execute(
+            """UPDATE chapters
+               SET missing_images = 0, source_size = ?, source_mtime = ?, source_hash = ?
+               WHERE id = ?""",
+            (
+                fingerprint["size"],
+                fingerprint["mtime"],
+                fingerprint["hash"],
+                chapter["id"],
+            ),
+        )
+        db.commit()
+
+    # Images of the chapter's previous extraction, now unreferenced
+    release_images(old_image_paths)
+    pdf_cache.invalidate_chapter(chapter["id"])
+    return len(problems_data)
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS)
+    return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
 
 
 async def _run_extraction(
     job_id: str, problem_set_id: int, chapters: list[dict]
 ) -> None:
+    """Extract all chapters on the process pool.
+
+    Chapters are submitted up front and committed in completion order,
+    so one slow chapter does not hold back the others.
+    """
     job = _jobs[job_id]
     total_problems = 0
+    loop = asyncio.get_running_loop()
+    pool = _get_process_pool()
+    pending: dict[asyncio.Future, dict] = {}
+    # Spare cores go to page-level sharding when there are few chapters
+    page_workers = max(1, EXTRACTION_WORKERS // max(1, len(chapters)))
 
     try:
         for idx, chapter in enumerate(chapters):
-            if job["cancelled"]:
-                await job["events"].put({
-                    "event": "cancelled",
-                    "data": '{"type":"cancelled"}',
-                })
-                return
-
+            # Sent on submission: the pool picks chapters up as workers
+            # free up, so there is no single chapter in progress
             await job["events"].put({
                 "event": "progress",
                 "data": _json_str({
-                    "type": "chapter_start",
+                    "type": "chapter_queued",
                     "chapter": chapter["name"],
                     "index": idx,
                     "total_chapters": len(chapters),
                 }),
             })
 
-            output_dir = IMAGES_DIR / str(problem_set_id) / str(chapter["id"])
-            output_dir.mkdir(parents=True, exist_ok=True)
+            future = loop.run_in_executor(
+                pool, extract_chapter_list, chapter["pdf_path"], page_workers
+            )
+            pending[future] = chapter
 
-            chapter_problems = 0
+        job["futures"] = list(pending)
 
-            loop = asyncio.get_event_loop()
-            problems_data = await loop.run_in_executor(
-                None,
-                lambda ch=chapter: list(extract_chapter(ch["pdf_path"], output_dir)),
+        while pending:
+            done, _ = await asyncio.wait(
+                pending.keys(), return_when=asyncio.FIRST_COMPLETED
             )
 
-            with get_db() as db:
-                for prob in problems_data:
-                    if job["cancelled"]:
-                        break
+            if job["cancelled"]:
+                for future in pending:
+                    future.cancel()
+                await job["events"].put({
+                    "event": "cancelled",
+                    "data": '{"type":"cancelled"}',
+                })
+                job["status"] = "cancelled"
+                return
 
-                    image_path = f"{problem_set_id}/{chapter['id']}/{prob['filename']}"
-                    db.execute(
-                        """INSERT INTO problems
-                           (chapter_id, number, image_path, width, height, file_size, page_num, column_pos)
-                           VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-                        (
-                            chapter["id"],
-                            prob["number"],
-                            image_path,
-                            prob["width"],
-                            prob["height"],
-                            prob["file_size"],
-                            prob["page_num"],
-                            prob["column_pos"],
-                        ),
-                    )
-                    chapter_problems += 1
-                    total_problems += 1
-
-                    if chapter_problems % 5 == 0 or chapter_problems == len(problems_data):
-                        await job["events"].put({
-                            "event": "progress",
-                            "data": _json_str({
-                                "type": "problem",
-                                "chapter": chapter["name"],
-                                "number": prob["number"],
-                                "total_so_far": total_problems,
-                            }),
-                        })
-
-                db.execute(
-                    "UPDATE chapters SET total_problems = ? WHERE id = ?",
-                    (chapter_problems, chapter["id"]),
-                )
-                db.commit()
+            for future in done:
+                chapter = pending.pop(future)
+                problems_data = future.result()
+                chapter_problems = await run_db(_save_chapter, chapter, problems_data)
+                total_problems += chapter_problems
 
-            await job["events"].put({
-                "event": "progress",
-                "data": _json_str({
-                    "type": "chapter_done",
-                    "chapter": chapter["name"],
-                    "problems": chapter_problems,
-                }),
-            })
+                await job["events"].put({
+                    "event": "progress",
+                    "data": _json_str({
+                        "type": "problem",
+                        "chapter": chapter["name"],
+                        "number": problems_data[-1]["number"] if problems_data else 0,
+                        "total_so_far": total_problems,
+                    }),
+                })
+                await job["events"].put({
+                    "event": "progress",
+                    "data": _json_str({
+                        "type": "chapter_done",
+                        "chapter": chapter["name"],
+                        "problems": chapter_problems,
+                    }),
+                })
 
         await job["events"].put({
             "event": "progress",
@@ -173,6 +365,8 @@ async def _run_extraction(
         job["status"] = "done"
 
     except Exception as e:
+        for future in pending:
+            future.cancel()
         await job["events"].put({
             "event": "progress",
             "data": _json_str({"type": "error", "message": str(e)}),
@@ -208,5 +402,9 @@ async def extraction_progress(job_id: str):
 async def cancel_extraction(job_id: str):
     if job_id not in _jobs:
         raise HTTPException(status_code=404, detail="Job not found")
-    _jobs[job_id]["cancelled"] = True
+    job = _jobs[job_id]
+    job["cancelled"] = True
+    # Wake the runner and drop chapters that have not started yet
+    for future in job["futures"]:
+        future.cancel()
     return {"status": "cancelling"}
@@ -0,0 +1,35 @@
+from typing import Literal
+
+from fastapi import APIRouter, HTTPException, Request
+
+from backend.services.image_derivatives import DERIVED_DIR, get_derivative
+from backend.services.image_store import image_digest
+from backend.utils.http_cache import IMMUTABLE, REVALIDATE, cached_file_response
+
+router = APIRouter(prefix="/api/images", tags=["images"])
+
+
+@router.get("/{image_path:path}")
+def get_image(
+    request: Request,
+    image_path: str,
+    size: Literal["thumb", "medium", "original"] = "original",
+):
+    """Serve a problem image, or a downscaled copy generated on first request.
+
+    Blob URLs are content addressed and cached as immutable; legacy
+    chapter-directory images are revalidated by ETag.
+    """
+    filepath = get_derivative(image_path, size)
+    if filepath is None:
+        raise HTTPException(status_code=404, detail="이미지를 찾을 수 없습니다.")
+    derived = filepath.is_relative_to(DERIVED_DIR)
+    digest = image_digest(image_path)
+    return cached_file_response(
+        request,
+        filepath,
+        etag=f"{digest}-{size if derived else 'original'}" if digest else None,
+        cache_control=IMMUTABLE if digest else REVALIDATE,
+        # Derivatives are always JPEG, whatever the source's extension
+        media_type="image/jpeg" if derived else None,
+    )
@@ -2,30 +2,90 @@
 
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
 import re
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncGenerator, Iterator
 
-from fastapi import APIRouter, HTTPException
-from starlette.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Request
+from sse_starlette.sse import EventSourceResponse
+from starlette.responses import Response, StreamingResponse
 
-from backend.config import PDF_OUTPUT_DIR
-from backend.models import PdfBatchRequest, PdfGenerateRequest, PdfResponse
-from backend.services.pdf_generator import generate_batch_pdf, generate_wrong_answer_pdf
+from backend.config import PDF_JOB_WORKERS, PDF_OUTPUT_DIR
+from backend.models import (
+    PdfBatchRequest,
+    PdfGenerateRequest,
+    PdfJobResponse,
+    PdfJobStatus,
+    PdfPlanRequest,
+    PdfResponse,
+)
+from backend.services.pdf_generator import (
+    GenerationCancelled,
+    generate_batch_pdf,
+    generate_wrong_answer_pdf,
+    plan_pdf,
+    render_batch_pdf,
+    render_wrong_answer_pdf,
+)
+from backend.utils.http_cache import IMMUTABLE, REVALIDATE, cached_file_response
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["pdf"])
 
 _SAFE_FILENAME = re.compile(r"^[\w\-]+\.pdf$")
+# Cache key suffix of generated file names (see pdf_cache.cache_key)
+_DIGEST_SUFFIX = re.compile(r"_([0-9a-f]{16})\.pdf$")
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+_jobs: dict[str, dict] = {}
+_job_pool: ThreadPoolExecutor | None = None
+
+
+def _iter_file(filename: str) -> Iterator[bytes]:
+    with open(PDF_OUTPUT_DIR / filename, "rb") as f:
+        while chunk := f.read(_STREAM_CHUNK_SIZE):
+            yield chunk
+
+
+def _iter_bytes(content: bytes) -> Iterator[bytes]:
+    view = memoryview(content)
+    for start in range(0, len(view), _STREAM_CHUNK_SIZE):
+        yield bytes(view[start:start + _STREAM_CHUNK_SIZE])
+
+
+def _pdf_stream(filename: str, chunks: Iterator[bytes]) -> StreamingResponse:
+    return StreamingResponse(
+        chunks,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def _pages_saved(
+    set_ids: list[int], body: PdfGenerateRequest | PdfBatchRequest, dividers: bool
+) -> int | None:
+    """Pages a compact layout saved, from a plan (no rendering); None if standard."""
+    if body.layout == "standard":
+        return None
+    plan = plan_pdf(set_ids, [body.spacer_ratio], dividers, layout=body.layout)
+    return plan[0]["pages_saved"]
 
 
 @router.post("/api/pdf/generate")
-async def generate_pdf(body: PdfGenerateRequest) -> PdfResponse:
+def generate_pdf(body: PdfGenerateRequest) -> PdfResponse:
     """Generate PDF for a single wrong answer set."""
     try:
         filename = generate_wrong_answer_pdf(
             wrong_answer_set_id=body.wrong_answer_set_id,
             spacer_ratio=body.spacer_ratio,
+            print_profile=body.print_profile,
+            layout=body.layout,
         )
     except ValueError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
@@ -38,11 +98,12 @@ async def generate_pdf(body: PdfGenerateRequest) -> PdfResponse:
     return PdfResponse(
         filename=filename,
         download_url=f"/api/pdf/download/{filename}",
+        pages_saved=_pages_saved([body.wrong_answer_set_id], body, False),
     )
 
 
 @router.post("/api/pdf/batch")
-async def generate_batch(body: PdfBatchRequest) -> PdfResponse:
+def generate_batch(body: PdfBatchRequest) -> PdfResponse:
     """Generate batch PDF for multiple students."""
     if not body.wrong_answer_set_ids:
         raise HTTPException(
@@ -53,7 +114,10 @@ async def generate_batch(body: PdfBatchRequest) -> PdfResponse:
         filename = generate_batch_pdf(
             wrong_answer_set_ids=body.wrong_answer_set_ids,
             spacer_ratio=body.spacer_ratio,
+            print_profile=body.print_profile,
+            layout=body.layout,
             include_dividers=body.include_dividers,
+            parallel=body.parallel,
         )
     except ValueError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
@@ -66,12 +130,119 @@ async def generate_batch(body: PdfBatchRequest) -> PdfResponse:
     return PdfResponse(
         filename=filename,
         download_url=f"/api/pdf/download/{filename}",
+        pages_saved=_pages_saved(
+            body.wrong_answer_set_ids, body, body.include_dividers
+        ),
     )
 
 
+@router.post("/api/pdf/plan")
+def plan(body: PdfPlanRequest) -> dict:
+    """Page plan and page count for each spacer ratio, without rendering.
+
+    Only stored problem sizes are read, so many ratios can be compared
+    at once.
+    """
+    try:
+        plans = plan_pdf(
+            wrong_answer_set_ids=body.wrong_answer_set_ids,
+            spacer_ratios=body.spacer_ratios,
+            include_dividers=body.include_dividers,
+            include_placements=body.include_placements,
+            layout=body.layout,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+
+    return {"plans": plans}
+
+
+@router.post("/api/pdf/generate/stream")
+def stream_pdf(body: PdfGenerateRequest, persist: bool = True) -> StreamingResponse:
+    """Render a single set and send the PDF in the response body.
+
+    With persist=false nothing is written to PDF_OUTPUT_DIR.
+    """
+    try:
+        if persist:
+            filename = generate_wrong_answer_pdf(
+                wrong_answer_set_id=body.wrong_answer_set_id,
+                spacer_ratio=body.spacer_ratio,
+                print_profile=body.print_profile,
+                layout=body.layout,
+            )
+            chunks = _iter_file(filename)
+        else:
+            filename, content = render_wrong_answer_pdf(
+                wrong_answer_set_id=body.wrong_answer_set_id,
+                spacer_ratio=body.spacer_ratio,
+                print_profile=body.print_profile,
+                layout=body.layout,
+            )
+            chunks = _iter_bytes(content)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except Exception as exc:
+        logger.error("PDF generation failed: %s", exc, exc_info=True)
+        raise HTTPException(
+            status_code=500, detail="PDF 생성에 실패했습니다."
+        ) from exc
+
+    return _pdf_stream(filename, chunks)
+
+
+@router.post("/api/pdf/batch/stream")
+def stream_batch(body: PdfBatchRequest, persist: bool = True) -> StreamingResponse:
+    """Render a batch and send the PDF in the response body.
+
+    With persist=false nothing is written to PDF_OUTPUT_DIR.
+    """
+    if not body.wrong_answer_set_ids:
+        raise HTTPException(
+            status_code=422, detail="하나 이상의 오답노트를 선택해주세요."
+        )
+
+    try:
+        if persist:
+            filename = generate_batch_pdf(
+                wrong_answer_set_ids=body.wrong_answer_set_ids,
+                spacer_ratio=body.spacer_ratio,
+                print_profile=body.print_profile,
+                layout=body.layout,
+                include_dividers=body.include_dividers,
+                parallel=body.parallel,
+            )
+            chunks = _iter_file(filename)
+        else:
+            filename, content = render_batch_pdf(
+                wrong_answer_set_ids=body.wrong_answer_set_ids,
+                spacer_ratio=body.spacer_ratio,
+                print_profile=body.print_profile,
+                layout=body.layout,
+                include_dividers=body.include_dividers,
+                parallel=body.parallel,
+            )
+            chunks = _iter_bytes(content)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except Exception as exc:
+        logger.error("Batch PDF generation failed: %s", exc, exc_info=True)
+        raise HTTPException(
+            status_code=500, detail="일괄 PDF 생성에 실패했습니다."
+        ) from exc
+
+    return _pdf_stream(filename, chunks)
+
+
 @router.get("/api/pdf/download/{filename}")
-async def download_pdf(filename: str) -> FileResponse:
-    """Download a generated PDF file."""
+async def download_pdf(request: Request, filename: str) -> Response:
+    """Download a generated PDF file.
+
+    Names carry a digest of the rendered inputs, so the digest is the
+    ETag and the file is cached as immutable. (The cache touches mtime on
+    every hit, which would make an mtime-based validator useless.) Files
+    from before digest names are revalidated instead.
+    """
     if not _SAFE_FILENAME.match(filename):
         raise HTTPException(status_code=400, detail="잘못된 파일명입니다.")
 
@@ -79,8 +250,178 @@ async def download_pdf(filename: str) -> FileResponse:
     if not filepath.exists():
         raise HTTPException(status_code=404, detail="파일을 찾을 수 없습니다.")
 
-    return FileResponse(
-        path=str(filepath),
+    digest = _DIGEST_SUFFIX.search(filename)
+    return cached_file_response(
+        request,
+        filepath,
+        etag=digest.group(1) if digest else None,
+        cache_control=f"private, {IMMUTABLE}" if digest else REVALIDATE,
         media_type="application/pdf",
         filename=filename,
     )
+
+
+# ---------------------------------------------------------------------------
+# Background batch jobs
+# ---------------------------------------------------------------------------
+
+def _get_job_pool() -> ThreadPoolExecutor:
+    global _job_pool
+    if _job_pool is None:
+        _job_pool = ThreadPoolExecutor(
+            max_workers=PDF_JOB_WORKERS, thread_name_prefix="pdf-job"
+        )
+    return _job_pool
+
+
+def shutdown_job_pool() -> None:
+    global _job_pool
+    for job in _jobs.values():
+        job["cancel_event"].set()
+    if _job_pool is not None:
+        _job_pool.shutdown(wait=False, cancel_futures=True)
+        _job_pool = None
+
+
+def _json_str(obj: dict) -> str:
+    return json.dumps(obj, ensure_ascii=False)
+
+
+@router.post("/api/pdf/jobs")
+async def submit_pdf_job(body: PdfBatchRequest) -> PdfJobResponse:
+    """Queue a batch PDF; follow it at /api/pdf/jobs/progress/{job_id}."""
+    if not body.wrong_answer_set_ids:
+        raise HTTPException(
+            status_code=422, detail="하나 이상의 오답노트를 선택해주세요."
+        )
+
+    job_id = str(uuid.uuid4())
+    _jobs[job_id] = {
+        "status": "queued",
+        "cancel_event": threading.Event(),
+        "students_done": 0,
+        "total_students": len(body.wrong_answer_set_ids),
+        "filename": None,
+        "future": None,
+        "events": asyncio.Queue(),
+    }
+
+    asyncio.get_event_loop().create_task(_run_pdf_job(job_id, body))
+
+    return PdfJobResponse(
+        job_id=job_id, total_students=len(body.wrong_answer_set_ids)
+    )
+
+
+async def _run_pdf_job(job_id: str, body: PdfBatchRequest) -> None:
+    """Render the batch on the bounded job pool, relaying progress as events."""
+    job = _jobs[job_id]
+    loop = asyncio.get_running_loop()
+
+    def emit(data: dict) -> None:
+        # Called from the worker thread
+        loop.call_soon_threadsafe(
+            job["events"].put_nowait, {"event": "progress", "data": _json_str(data)}
+        )
+
+    def on_progress(done: int, total: int) -> None:
+        job["students_done"] = done
+        emit({"type": "student_done", "students_done": done, "total_students": total})
+
+    def run() -> str:
+        if job["cancel_event"].is_set():
+            raise GenerationCancelled()
+        job["status"] = "running"
+        emit({"type": "started", "total_students": job["total_students"]})
+        return generate_batch_pdf(
+            wrong_answer_set_ids=body.wrong_answer_set_ids,
+            spacer_ratio=body.spacer_ratio,
+            print_profile=body.print_profile,
+            layout=body.layout,
+            include_dividers=body.include_dividers,
+            parallel=body.parallel,
+            progress=on_progress,
+            cancel_event=job["cancel_event"],
+        )
+
+    job["future"] = loop.run_in_executor(_get_job_pool(), run)
+    try:
+        filename = await job["future"]
+    except (GenerationCancelled, asyncio.CancelledError):
+        job["status"] = "cancelled"
+        await job["events"].put({
+            "event": "cancelled",
+            "data": '{"type":"cancelled"}',
+        })
+        return
+    except Exception as e:
+        if isinstance(e, ValueError):
+            message = str(e)
+        else:
+            logger.error("Batch PDF job %s failed: %s", job_id, e, exc_info=True)
+            message = "일괄 PDF 생성에 실패했습니다."
+        job["status"] = "error"
+        await job["events"].put({
+            "event": "progress",
+            "data": _json_str({"type": "error", "message": message}),
+        })
+        return
+
+    job["status"] = "done"
+    job["filename"] = filename
+    await job["events"].put({
+        "event": "progress",
+        "data": _json_str({
+            "type": "done",
+            "filename": filename,
+            "download_url": f"/api/pdf/download/{filename}",
+        }),
+    })
+
+
+@router.get("/api/pdf/jobs/{job_id}")
+async def get_pdf_job(job_id: str) -> PdfJobStatus:
+    if job_id not in _jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    job = _jobs[job_id]
+    filename = job["filename"]
+    return PdfJobStatus(
+        job_id=job_id,
+        status=job["status"],
+        students_done=job["students_done"],
+        total_students=job["total_students"],
+        filename=filename,
+        download_url=f"/api/pdf/download/{filename}" if filename else None,
+    )
+
+
+@router.get("/api/pdf/jobs/progress/{job_id}")
+async def pdf_job_progress(job_id: str):
+    if job_id not in _jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream() -> AsyncGenerator:
+        job = _jobs[job_id]
+        while True:
+            try:
+                event = await asyncio.wait_for(job["events"].get(), timeout=30.0)
+                yield event
+                data = json.loads(event["data"])
+                if data.get("type") in ("done", "error", "cancelled"):
+                    break
+            except asyncio.TimeoutError:
+                yield {"event": "ping", "data": "{}"}
+
+    return EventSourceResponse(event_stream())
+
+
+@router.post("/api/pdf/jobs/cancel/{job_id}")
+async def cancel_pdf_job(job_id: str):
+    if job_id not in _jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    job = _jobs[job_id]
+    job["cancel_event"].set()
+    # Drops the job if it is still waiting for a free worker
+    if job["future"] is not None and job["status"] == "queued":
+        job["future"].cancel()
+    return {"status": "cancelling"}
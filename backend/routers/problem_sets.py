@@ -1,6 +1,5 @@
 from fastapi import APIRouter, HTTPException
 
-from backend.config import IMAGES_DIR
 from backend.database import get_db
 from backend.services.image_store import delete_problem_set_images
 from backend.services.integrity import check_problem_set_integrity
@@ -9,24 +8,21 @@ router = APIRouter(prefix="/api/problem-sets", tags=["problem_sets"])
 
 
 @router.get("/{problem_set_id}/health")
-async def problem_set_health(problem_set_id: int):
-    """Check integrity of all chapters in a problem set."""
-    return check_problem_set_integrity(problem_set_id)
+def problem_set_health(problem_set_id: int, refresh: bool = False):
+    """Integrity of all chapters in a problem set, as of their last check.
+
+    Pass refresh=true to re-check now.
+    """
+    return check_problem_set_integrity(problem_set_id, refresh=refresh)
 
 
 @router.get("")
-async def list_problem_sets():
+def list_problem_sets():
     with get_db() as db:
         rows = db.execute(
-            """SELECT ps.id, ps.name, ps.created_at,
-                      COUNT(DISTINCT c.id) as chapter_count,
-                      (SELECT COUNT(*) FROM problems p
-                       JOIN chapters ch ON p.chapter_id = ch.id
-                       WHERE ch.problem_set_id = ps.id) as total_problems
-               FROM problem_sets ps
-               LEFT JOIN chapters c ON c.problem_set_id = ps.id
-               GROUP BY ps.id
-               ORDER BY ps.created_at DESC"""
+            """SELECT id, name, created_at, chapter_count, total_problems
+               FROM problem_sets
+               ORDER BY created_at DESC"""
         ).fetchall()
     return [
         {
@@ -41,7 +37,7 @@ async def list_problem_sets():
 
 
 @router.get("/{problem_set_id}")
-async def get_problem_set(problem_set_id: int):
+def get_problem_set(problem_set_id: int):
     with get_db() as db:
         ps = db.execute(
             "SELECT * FROM problem_sets WHERE id = ?", (problem_set_id,)
@@ -50,29 +46,24 @@ async def get_problem_set(problem_set_id: int):
             raise HTTPException(status_code=404, detail="문제집을 찾을 수 없습니다.")
 
         chapters = db.execute(
-            """SELECT c.id, c.name, c.sort_order,
-                      COUNT(p.id) as problem_count
-               FROM chapters c
-               LEFT JOIN problems p ON p.chapter_id = c.id
-               WHERE c.problem_set_id = ?
-               GROUP BY c.id
-               ORDER BY c.sort_order""",
+            """SELECT id, name, sort_order, total_problems, missing_images
+               FROM chapters
+               WHERE problem_set_id = ?
+               ORDER BY sort_order""",
             (problem_set_id,),
         ).fetchall()
 
-    chapter_list = []
-    for c in chapters:
-        chapter_dir = IMAGES_DIR / str(problem_set_id) / str(c["id"])
-        image_count = len(list(chapter_dir.glob("*.jpg"))) if chapter_dir.is_dir() else 0
-        chapter_list.append(
-            {
-                "id": c["id"],
-                "name": c["name"],
-                "sort_order": c["sort_order"],
-                "problem_count": c["problem_count"],
-                "image_count": image_count,
-            }
-        )
+    chapter_list = [
+        {
+            "id": c["id"],
+            "name": c["name"],
+            "sort_order": c["sort_order"],
+            "problem_count": c["total_problems"],
+            # As of the last integrity check
+            "image_count": c["total_problems"] - c["missing_images"],
+        }
+        for c in chapters
+    ]
 
     return {
         "id": ps["id"],
@@ -83,7 +74,7 @@ async def get_problem_set(problem_set_id: int):
 
 
 @router.delete("/{problem_set_id}")
-async def delete_problem_set(problem_set_id: int):
+def delete_problem_set(problem_set_id: int):
     with get_db() as db:
         ps = db.execute(
             "SELECT id FROM problem_sets WHERE id = ?", (problem_set_id,)
@@ -91,6 +82,16 @@ async def delete_problem_set(problem_set_id: int):
         if not ps:
             raise HTTPException(status_code=404, detail="문제집을 찾을 수 없습니다.")
 
+        image_paths = [
+            row["image_path"]
+            for row in db.execute(
+                "SELECT p.image_path FROM problems p "
+                "JOIN chapters c ON c.id = p.chapter_id "
+                "WHERE c.problem_set_id = ?",
+                (problem_set_id,),
+            ).fetchall()
+        ]
+
         db.execute(
             "DELETE FROM problems WHERE chapter_id IN (SELECT id FROM chapters WHERE problem_set_id = ?)",
             (problem_set_id,),
@@ -101,5 +102,5 @@ async def delete_problem_set(problem_set_id: int):
         db.execute("DELETE FROM problem_sets WHERE id = ?", (problem_set_id,))
         db.commit()
 
-    delete_problem_set_images(problem_set_id)
+    delete_problem_set_images(problem_set_id, image_paths)
     return {"status": "deleted"}
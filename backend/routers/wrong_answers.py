@@ -1,9 +1,11 @@
 import json
+import sqlite3
 from datetime import date
 
 from fastapi import APIRouter, HTTPException
 
 from backend.database import get_db
+from backend.services import pdf_cache
 from backend.models import (
     BulkPerStudentCreate,
     BulkWrongAnswerSetCreate,
@@ -17,6 +19,48 @@ from backend.models import (
 router = APIRouter(tags=["wrong_answers"])
 
 
+def _insert_entry(
+    db: sqlite3.Connection, set_id: int, chapter_id: int, problem_numbers: list[int]
+) -> None:
+    db.execute(
+        "INSERT INTO wrong_answers (wrong_answer_set_id, chapter_id, problem_numbers) "
+        "VALUES (?, ?, ?)",
+        (set_id, chapter_id, json.dumps(problem_numbers)),
+    )
+    db.executemany(
+        "INSERT OR IGNORE INTO wrong_answer_items (wrong_answer_set_id, chapter_id, number) "
+        "VALUES (?, ?, ?)",
+        [(set_id, chapter_id, number) for number in problem_numbers],
+    )
+
+
+def _load_entries(db: sqlite3.Connection, set_id: int) -> list[WrongAnswerEntryResponse]:
+    rows = db.execute(
+        "SELECT wa.id, wa.chapter_id, c.name as chapter_name, "
+        "ps.name as problem_set_name "
+        "FROM wrong_answers wa "
+        "JOIN chapters c ON c.id = wa.chapter_id "
+        "JOIN problem_sets ps ON ps.id = c.problem_set_id "
+        "WHERE wa.wrong_answer_set_id = ? "
+        "ORDER BY ps.name, c.name",
+        (set_id,),
+    ).fetchall()
+
+    numbers: dict[int, list[int]] = {r["chapter_id"]: [] for r in rows}
+    for item in db.execute(
+        "SELECT chapter_id, number FROM wrong_answer_items "
+        "WHERE wrong_answer_set_id = ? ORDER BY chapter_id, number",
+        (set_id,),
+    ):
+        if item["chapter_id"] in numbers:
+            numbers[item["chapter_id"]].append(item["number"])
+
+    return [
+        WrongAnswerEntryResponse(**dict(r), problem_numbers=numbers[r["chapter_id"]])
+        for r in rows
+    ]
+
+
 @router.get("/api/students/{student_id}/wrong-answer-sets")
 def list_sets_for_student(student_id: int) -> list[WrongAnswerSetResponse]:
     with get_db() as db:
@@ -102,11 +146,7 @@ def bulk_create_sets(body: BulkWrongAnswerSetCreate) -> dict:
 
             for entry in body.entries:
                 if entry.problem_numbers:
-                    db.execute(
-                        "INSERT INTO wrong_answers (wrong_answer_set_id, chapter_id, problem_numbers) "
-                        "VALUES (?, ?, ?)",
-                        (set_id, entry.chapter_id, json.dumps(entry.problem_numbers)),
-                    )
+                    _insert_entry(db, set_id, entry.chapter_id, entry.problem_numbers)
 
         db.commit()
 
@@ -129,7 +169,7 @@ def list_recent_sets() -> list[dict]:
 
 
 @router.post("/api/wrong-answer-sets/bulk-per-student")
-async def bulk_create_per_student(req: BulkPerStudentCreate):
+def bulk_create_per_student(req: BulkPerStudentCreate):
     """Create wrong answer sets with different entries per student."""
     created_set_ids = []
 
@@ -188,10 +228,7 @@ async def bulk_create_per_student(req: BulkPerStudentCreate):
             for entry in student_entry.entries:
                 if not entry.problem_numbers:
                     continue
-                db.execute(
-                    "INSERT INTO wrong_answers (wrong_answer_set_id, chapter_id, problem_numbers) VALUES (?, ?, ?)",
-                    (set_id, entry.chapter_id, json.dumps(entry.problem_numbers)),
-                )
+                _insert_entry(db, set_id, entry.chapter_id, entry.problem_numbers)
 
         db.commit()
 
@@ -201,6 +238,22 @@ async def bulk_create_per_student(req: BulkPerStudentCreate):
     }
 
 
+@router.get("/api/chapters/{chapter_id}/wrong-answer-stats")
+def chapter_wrong_answer_stats(chapter_id: int) -> list[dict]:
+    """How many sets and distinct students missed each problem of a chapter."""
+    with get_db() as db:
+        rows = db.execute(
+            "SELECT i.number, COUNT(*) AS set_count, "
+            "COUNT(DISTINCT ws.student_id) AS student_count "
+            "FROM wrong_answer_items i "
+            "JOIN wrong_answer_sets ws ON ws.id = i.wrong_answer_set_id "
+            "WHERE i.chapter_id = ? "
+            "GROUP BY i.number ORDER BY i.number",
+            (chapter_id,),
+        ).fetchall()
+    return [dict(r) for r in rows]
+
+
 # ---- Parameterized {set_id} routes ----
 
 
@@ -229,23 +282,7 @@ def get_entries(set_id: int) -> list[WrongAnswerEntryResponse]:
         if not ws:
             raise HTTPException(status_code=404, detail="오답노트를 찾을 수 없습니다.")
 
-        rows = db.execute(
-            "SELECT wa.id, wa.chapter_id, c.name as chapter_name, "
-            "ps.name as problem_set_name, wa.problem_numbers "
-            "FROM wrong_answers wa "
-            "JOIN chapters c ON c.id = wa.chapter_id "
-            "JOIN problem_sets ps ON ps.id = c.problem_set_id "
-            "WHERE wa.wrong_answer_set_id = ? "
-            "ORDER BY ps.name, c.name",
-            (set_id,),
-        ).fetchall()
-
-        result = []
-        for r in rows:
-            d = dict(r)
-            d["problem_numbers"] = json.loads(d["problem_numbers"])
-            result.append(WrongAnswerEntryResponse(**d))
-        return result
+        return _load_entries(db, set_id)
 
 
 @router.put("/api/wrong-answer-sets/{set_id}/entries")
@@ -273,33 +310,17 @@ def save_entries(
         db.execute(
             "DELETE FROM wrong_answers WHERE wrong_answer_set_id = ?", (set_id,)
         )
+        db.execute(
+            "DELETE FROM wrong_answer_items WHERE wrong_answer_set_id = ?", (set_id,)
+        )
+        pdf_cache.invalidate_sets([set_id])
 
         for entry in body.entries:
-            db.execute(
-                "INSERT INTO wrong_answers (wrong_answer_set_id, chapter_id, problem_numbers) "
-                "VALUES (?, ?, ?)",
-                (set_id, entry.chapter_id, json.dumps(entry.problem_numbers)),
-            )
+            _insert_entry(db, set_id, entry.chapter_id, entry.problem_numbers)
 
         db.commit()
 
-        rows = db.execute(
-            "SELECT wa.id, wa.chapter_id, c.name as chapter_name, "
-            "ps.name as problem_set_name, wa.problem_numbers "
-            "FROM wrong_answers wa "
-            "JOIN chapters c ON c.id = wa.chapter_id "
-            "JOIN problem_sets ps ON ps.id = c.problem_set_id "
-            "WHERE wa.wrong_answer_set_id = ? "
-            "ORDER BY ps.name, c.name",
-            (set_id,),
-        ).fetchall()
-
-        result = []
-        for r in rows:
-            d = dict(r)
-            d["problem_numbers"] = json.loads(d["problem_numbers"])
-            result.append(WrongAnswerEntryResponse(**d))
-        return result
+        return _load_entries(db, set_id)
 
 
 @router.delete("/api/wrong-answer-sets/{set_id}")
@@ -316,4 +337,5 @@ def delete_set(set_id: int) -> dict:
         )
         db.execute("DELETE FROM wrong_answer_sets WHERE id = ?", (set_id,))
         db.commit()
-        return {"ok": True}
+    pdf_cache.invalidate_sets([set_id])
+    return {"ok": True}
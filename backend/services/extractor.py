@@ -1,59 +1,195 @@
 import fitz
-from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 from typing import Generator
 
+from backend.config import EXTRACTION_WORKERS, PAGE_SHARD_SIZE
+from backend.services.image_store import store_image
+
 MIDPOINT = 298  # A4 page center for 2-column layout
+BBOX_TOLERANCE = 1.0  # points; stored vs. re-scanned bbox edges
+
+
+def _sorted_image_blocks(page: fitz.Page) -> list[dict]:
+    """Return the page's image blocks in 2-column reading order."""
+    blocks = page.get_text("dict")["blocks"]
+    img_blocks = [b for b in blocks if b["type"] == 1]
+
+    return sorted(
+        img_blocks,
+        key=lambda b: (0 if b["bbox"][0] < MIDPOINT else 1, b["bbox"][1]),
+    )
+
+
+def _problem_record(
+    number: int, image_path: str, bbox: tuple, file_size: int, page_idx: int
+) -> dict:
+    return {
+        "number": number,
+        "image_path": image_path,
+        "width": int(bbox[2] - bbox[0]),
+        "height": int(bbox[3] - bbox[1]),
+        "file_size": file_size,
+        "page_num": page_idx + 1,
+        "column_pos": "left" if bbox[0] < MIDPOINT else "right",
+        "bbox": tuple(bbox),
+    }
+
+
+def _extract_page_range(pdf_path: str, start: int, stop: int) -> list[list[dict]]:
+    """Store the images of pages [start, stop).
+
+    Problem numbers depend on every earlier page, so a shard cannot
+    number its blocks. Returns one list per page with an entry per image
+    block (``image_path`` is None for blocks without image data, which
+    still consume a number in a serial run).
+    """
+    pages: list[list[dict]] = []
+    doc = fitz.open(pdf_path)
+    try:
+        for page_idx in range(start, stop):
+            entries = []
+            for block in _sorted_image_blocks(doc[page_idx]):
+                img_data = block.get("image")
+                entries.append({
+                    "bbox": block["bbox"],
+                    "image_path": store_image(img_data) if img_data else None,
+                    "file_size": len(img_data) if img_data else 0,
+                })
+            pages.append(entries)
+    finally:
+        doc.close()
+    return pages
+
+
+def _extract_sharded(
+    pdf_path: str, page_count: int, max_workers: int
+) -> Generator[dict, None, None]:
+    """Extract page ranges on worker processes, then number them in order."""
+    ranges = [
+        (start, min(start + PAGE_SHARD_SIZE, page_count))
+        for start in range(0, page_count, PAGE_SHARD_SIZE)
+    ]
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(ranges))) as pool:
+        shards = list(
+            pool.map(
+                _extract_page_range,
+                [pdf_path] * len(ranges),
+                [start for start, _ in ranges],
+                [stop for _, stop in ranges],
+            )
+        )
+
+    pages = [page for shard in shards for page in shard]
+
+    # Prefix sum of per-page block counts gives each page's first number
+    offsets = [0]
+    for entries in pages:
+        offsets.append(offsets[-1] + len(entries))
 
+    for page_idx, entries in enumerate(pages):
+        for k, entry in enumerate(entries):
+            if entry["image_path"] is None:
+                continue
 
-def extract_chapter(pdf_path: str, output_dir: Path) -> Generator[dict, None, None]:
-    """Extract problem images from a PDF file.
+            yield _problem_record(
+                offsets[page_idx] + k + 1,
+                entry["image_path"],
+                entry["bbox"],
+                entry["file_size"],
+                page_idx,
+            )
+
+
+def extract_chapter(
+    pdf_path: str, max_workers: int = EXTRACTION_WORKERS
+) -> Generator[dict, None, None]:
+    """Extract problem images from a PDF file into the image store.
 
     Each image block in the PDF = 1 problem.
     2-column sorting: left column (x < MIDPOINT) sorted by y,
     then right column sorted by y.
+
+    Documents longer than PAGE_SHARD_SIZE pages are split into page
+    ranges and extracted on up to ``max_workers`` processes; numbering
+    is identical to a serial run.
     """
-    output_dir.mkdir(parents=True, exist_ok=True)
     doc = fitz.open(pdf_path)
+
+    if max_workers > 1 and doc.page_count > PAGE_SHARD_SIZE:
+        page_count = doc.page_count
+        doc.close()
+        yield from _extract_sharded(pdf_path, page_count, max_workers)
+        return
+
     problem_number = 0
 
     try:
         for page_idx, page in enumerate(doc):
-            blocks = page.get_text("dict")["blocks"]
-            img_blocks = [b for b in blocks if b["type"] == 1]
-
-            sorted_blocks = sorted(
-                img_blocks,
-                key=lambda b: (0 if b["bbox"][0] < MIDPOINT else 1, b["bbox"][1]),
-            )
-
-            for block in sorted_blocks:
+            for block in _sorted_image_blocks(page):
                 problem_number += 1
-                bbox = block["bbox"]
 
                 img_data = block.get("image")
                 if not img_data:
                     continue
 
-                width = int(bbox[2] - bbox[0])
-                height = int(bbox[3] - bbox[1])
+                yield _problem_record(
+                    problem_number,
+                    store_image(img_data),
+                    block["bbox"],
+                    len(img_data),
+                    page_idx,
+                )
+    finally:
+        doc.close()
 
-                filename = f"{problem_number:03d}.jpg"
-                filepath = output_dir / filename
 
-                with open(filepath, "wb") as f:
-                    f.write(img_data)
+def extract_problem_images(
+    pdf_path: str, targets: list[tuple[int, tuple]]
+) -> list[dict | None]:
+    """Re-extract the images at the given (page_num, bbox) positions.
 
-                file_size = filepath.stat().st_size
-                column = "left" if bbox[0] < MIDPOINT else "right"
+    Only the listed pages are scanned. Each target is matched to the
+    image block on its page whose bbox is closest (within BBOX_TOLERANCE
+    points per edge). Returns {"image_path", "file_size", "bbox"} per
+    target, or None if no block matches.
+    """
+    results: list[dict | None] = [None] * len(targets)
+    by_page: dict[int, list[int]] = {}
+    for idx, (page_num, _) in enumerate(targets):
+        by_page.setdefault(page_num, []).append(idx)
 
-                yield {
-                    "number": problem_number,
-                    "filename": filename,
-                    "width": width,
-                    "height": height,
-                    "file_size": file_size,
-                    "page_num": page_idx + 1,
-                    "column_pos": column,
+    doc = fitz.open(pdf_path)
+    try:
+        for page_num, indices in by_page.items():
+            if not 1 <= page_num <= doc.page_count:
+                continue
+            blocks = [
+                b for b in _sorted_image_blocks(doc[page_num - 1]) if b.get("image")
+            ]
+            for idx in indices:
+                bbox = targets[idx][1]
+                best = min(
+                    blocks,
+                    key=lambda b: max(abs(a - t) for a, t in zip(b["bbox"], bbox)),
+                    default=None,
+                )
+                if best is None or max(
+                    abs(a - t) for a, t in zip(best["bbox"], bbox)
+                ) > BBOX_TOLERANCE:
+                    continue
+                results[idx] = {
+                    "image_path": store_image(best["image"]),
+                    "file_size": len(best["image"]),
+                    "bbox": tuple(best["bbox"]),
                 }
     finally:
         doc.close()
+    return results
+
+
+def extract_chapter_list(pdf_path: str, max_workers: int = 1) -> list[dict]:
+    """Run extract_chapter to completion and return all problems.
+
+    Top-level so it can be submitted to a process pool.
+    """
+    return list(extract_chapter(pdf_path, max_workers))
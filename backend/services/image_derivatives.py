@@ -0,0 +1,181 @@
+"""Downscaled copies of problem images.
+
+Sized copies for the verification grid and print-resolution copies for
+PDF generation are generated on first use and kept at
+``IMAGES_DIR/derived/<variant>/<image_path>``. Blob paths are content
+addressed, so a blob's derivatives never go stale even when storing the
+same bytes again touches the blob; a legacy file's derivative is
+regenerated once it is older than the file. ``release_derivatives``
+drops them with their source.
+"""
+
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Iterable
+
+from PIL import Image
+
+from backend.config import IMAGES_DIR
+
+DERIVED_DIR = IMAGES_DIR / "derived"
+
+# Size name -> maximum width in pixels. Images are never upscaled.
+DERIVATIVE_WIDTHS = {"thumb": 400, "medium": 1000}
+
+JPEG_QUALITY = 82
+# Print copies are viewed at full size on paper, so compress less
+PRINT_JPEG_QUALITY = 85
+
+# How print copies are converted: "grayscale" drops color, "mono"
+# thresholds to 1-bit and stores losslessly as CCITT Group 4 (which
+# fpdf2 embeds without re-encoding). Mono copies are TIFF files, named
+# after the source with a .tif suffix; the others keep its name.
+PRINT_PROFILES = ("color", "grayscale", "mono")
+# Gray levels at or above this become white in "mono"
+MONO_THRESHOLD = 160
+
+
+def resolve_image(image_path: str) -> Path | None:
+    """Return the file for a stored image path, or None if it is outside the store."""
+    filepath = (IMAGES_DIR / image_path).resolve()
+    root = IMAGES_DIR.resolve()
+    if root not in filepath.parents or DERIVED_DIR.resolve() in filepath.parents:
+        return None
+    return filepath
+
+
+def _render(
+    source: Path, target: Path, max_width: int, quality: int, profile: str = "color"
+) -> bool:
+    """Write a converted copy of ``source``; False if it can be used as-is.
+
+    Color copies are only written for sources wider than ``max_width``;
+    if re-encoding does not make the file smaller (the source was already
+    compressed harder), the source bytes are cached instead.
+    """
+    with Image.open(source) as img:
+        if img.width <= max_width and profile == "color":
+            return False
+        options = {"format": "JPEG", "quality": quality, "optimize": True}
+        if img.width > max_width:
+            height = max(1, round(img.height * max_width / img.width))
+            img.draft(img.mode, (max_width, height))
+            img = img.resize((max_width, height), Image.Resampling.LANCZOS)
+        elif img.format == "JPEG":
+            # Not resampled: keep the source's luma tables rather than
+            # re-encoding at (usually) higher quality than it was stored
+            options = {
+                "format": "JPEG",
+                "qtables": [img.quantization[0]],
+                "optimize": True,
+            }
+
+        if profile == "mono":
+            img = img.convert("L").point(
+                lambda v: 255 if v >= MONO_THRESHOLD else 0, mode="1"
+            )
+            options = {"format": "TIFF", "compression": "group4"}
+        elif profile == "grayscale":
+            img = img.convert("L")
+        elif img.mode not in ("L", "RGB"):
+            img = img.convert("RGB")
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(
+            f".{target.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        img.save(tmp, **options)
+    if profile == "color" and tmp.stat().st_size >= source.stat().st_size:
+        shutil.copyfile(source, tmp)
+    os.replace(tmp, target)
+    return True
+
+
+def _target(variant_dir: Path, image_path: str) -> Path:
+    target = variant_dir / image_path
+    if variant_dir.name.endswith("-mono"):
+        return target.with_suffix(".tif")
+    return target
+
+
+def _derivative(
+    source: Path,
+    image_path: str,
+    variant: str,
+    max_width: int,
+    quality: int,
+    profile: str = "color",
+) -> Path:
+    target = _target(DERIVED_DIR / variant, image_path)
+    try:
+        target_mtime = target.stat().st_mtime_ns
+    except FileNotFoundError:
+        fresh = False
+    else:
+        # Only legacy per-chapter files can change under the same path
+        fresh = image_path.startswith("blobs/") or (
+            target_mtime >= source.stat().st_mtime_ns
+        )
+    if not fresh and not _render(source, target, max_width, quality, profile):
+        return source
+    return target
+
+
+def get_derivative(image_path: str, size: str) -> Path | None:
+    """Return the file to serve for ``image_path`` at ``size``.
+
+    ``size`` is a key of DERIVATIVE_WIDTHS or "original". Images no wider
+    than the size are served as-is. Returns None if the source image does
+    not exist.
+    """
+    source = resolve_image(image_path)
+    if source is None or not source.is_file():
+        return None
+    if size == "original":
+        return source
+    return _derivative(source, image_path, size, DERIVATIVE_WIDTHS[size], JPEG_QUALITY)
+
+
+def get_print_image(
+    image_path: str, width_px: int, profile: str = "color"
+) -> Path | None:
+    """Return ``image_path`` resampled to at most ``width_px`` for printing.
+
+    ``profile`` is one of PRINT_PROFILES. The copy is cached per source,
+    target width and profile, so a print DPI change produces new copies
+    instead of reusing stale ones. Returns None if the source image does
+    not exist.
+    """
+    source = resolve_image(image_path)
+    if source is None or not source.is_file():
+        return None
+    variant = f"print-{width_px}" if profile == "color" else f"print-{width_px}-{profile}"
+    return _derivative(
+        source, image_path, variant, width_px, PRINT_JPEG_QUALITY, profile
+    )
+
+
+def _variant_dirs() -> list[Path]:
+    if not DERIVED_DIR.is_dir():
+        return []
+    return [d for d in DERIVED_DIR.iterdir() if d.is_dir()]
+
+
+def release_derivatives(image_paths: Iterable[str]) -> None:
+    """Delete every derivative of the given images."""
+    variants = _variant_dirs()
+    for image_path in image_paths:
+        for variant in variants:
+            # Mono copies used to keep the source's name as well
+            (variant / image_path).unlink(missing_ok=True)
+            _target(variant, image_path).unlink(missing_ok=True)
+
+
+def release_derivative_dir(relative_dir: str) -> None:
+    """Delete the derivatives of a legacy per-chapter or per-set directory."""
+    for variant in _variant_dirs():
+        directory = variant / relative_dir
+        if directory.exists():
+            shutil.rmtree(directory)
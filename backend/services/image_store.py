@@ -1,42 +1,176 @@
+"""Content-addressed storage for problem images.
+
+Images are stored once per distinct content at
+``IMAGES_DIR/blobs/<hh>/<sha256>.jpg`` and problems reference them via
+``problems.image_path``. A blob is deleted when the last problem row
+referencing it goes away, together with its downscaled derivatives,
+unless it was stored within GC_GRACE_SECONDS; ``collect_garbage``
+sweeps those and anything else missed.
+
+Older libraries still hold per-chapter ``<ps>/<ch>/NNN.jpg`` files.
+Those paths keep working and are released the same way.
+"""
+
+import hashlib
+import json
+import logging
+import os
 import shutil
+import threading
+import time
 from pathlib import Path
+from typing import Iterable
 
 from backend.config import IMAGES_DIR
+from backend.database import get_db
+from backend.services.image_derivatives import release_derivative_dir, release_derivatives
+
+logger = logging.getLogger(__name__)
+
+BLOBS_DIR = IMAGES_DIR / "blobs"
+
+# Blobs younger than this are left alone by garbage collection, so images
+# written by a running extraction are not collected before their rows exist.
+GC_GRACE_SECONDS = 3600
 
 
 def _chapter_dir(problem_set_id: int, chapter_id: int) -> Path:
     return IMAGES_DIR / str(problem_set_id) / str(chapter_id)
 
 
-def save_problem_image(
-    problem_set_id: int, chapter_id: int, number: int, image_data: bytes
-) -> str:
-    directory = _chapter_dir(problem_set_id, chapter_id)
-    directory.mkdir(parents=True, exist_ok=True)
-    filename = f"{number:03d}.jpg"
-    filepath = directory / filename
-    with open(filepath, "wb") as f:
+def store_image(image_data: bytes, ext: str = "jpg") -> str:
+    """Store image bytes and return their path relative to IMAGES_DIR.
+
+    Storing bytes that are already present is a no-op; a truncated or
+    damaged copy (wrong size) is rewritten.
+    """
+    digest = hashlib.sha256(image_data).hexdigest()
+    relative = f"blobs/{digest[:2]}/{digest}.{ext}"
+    filepath = IMAGES_DIR / relative
+
+    try:
+        if filepath.stat().st_size == len(image_data):
+            # Refresh mtime so a concurrent GC sweep treats it as fresh
+            os.utime(filepath)
+            return relative
+    except FileNotFoundError:
+        # Missing, or collected between the stat and the utime
+        pass
+
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    tmp = filepath.with_name(f".{digest}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "wb") as f:
         f.write(image_data)
-    return str(filepath.relative_to(IMAGES_DIR))
+    os.replace(tmp, filepath)
+    return relative
+
 
+def image_digest(image_path: str) -> str | None:
+    """Return the content hash in a blob path, or None for legacy paths."""
+    if not image_path.startswith("blobs/"):
+        return None
+    return Path(image_path).stem
 
-def get_image_dir(problem_set_id: int, chapter_id: int) -> Path:
-    return _chapter_dir(problem_set_id, chapter_id)
+
+def image_url(image_path: str) -> str:
+    """URL of an image. Blob URLs embed the content hash, so they never go stale."""
+    return f"/api/images/{image_path}"
+
+
+def release_images(image_paths: Iterable[str]) -> int:
+    """Delete the given images unless a problem row still references them.
+
+    Call after the referencing rows have been deleted or updated. Blobs
+    stored within GC_GRACE_SECONDS are left for ``collect_garbage``: a
+    running extraction or repair may have stored the same bytes and not
+    inserted its rows yet. Returns the number of files removed.
+    """
+    paths = set(image_paths)
+    if not paths:
+        return 0
+
+    with get_db() as db:
+        referenced = {
+            row["image_path"]
+            for row in db.execute(
+                "SELECT DISTINCT image_path FROM problems "
+                "WHERE image_path IN (SELECT value FROM json_each(?))",
+                (json.dumps(sorted(paths)),),
+            ).fetchall()
+        }
+
+    cutoff = time.time() - GC_GRACE_SECONDS
+    removed = 0
+    released = []
+    for image_path in paths - referenced:
+        filepath = IMAGES_DIR / image_path
+        if filepath.is_file():
+            if image_digest(image_path) and filepath.stat().st_mtime > cutoff:
+                continue
+            filepath.unlink()
+            removed += 1
+        released.append(image_path)
+    release_derivatives(released)
+    return removed
 
 
 def delete_problem_image(image_path: str) -> None:
-    filepath = IMAGES_DIR / image_path
-    if filepath.exists():
-        filepath.unlink()
+    release_images([image_path])
 
 
-def delete_chapter_images(problem_set_id: int, chapter_id: int) -> None:
+def delete_chapter_images(
+    problem_set_id: int, chapter_id: int, image_paths: Iterable[str] = ()
+) -> None:
+    release_images(image_paths)
     directory = _chapter_dir(problem_set_id, chapter_id)
     if directory.exists():
         shutil.rmtree(directory)
+    release_derivative_dir(f"{problem_set_id}/{chapter_id}")
 
 
-def delete_problem_set_images(problem_set_id: int) -> None:
+def delete_problem_set_images(
+    problem_set_id: int, image_paths: Iterable[str] = ()
+) -> None:
+    release_images(image_paths)
     directory = IMAGES_DIR / str(problem_set_id)
     if directory.exists():
         shutil.rmtree(directory)
+    release_derivative_dir(str(problem_set_id))
+
+
+def collect_garbage() -> int:
+    """Remove blobs that no problem references. Returns files removed."""
+    if not BLOBS_DIR.is_dir():
+        return 0
+
+    with get_db() as db:
+        referenced = {
+            row["image_path"]
+            for row in db.execute(
+                "SELECT DISTINCT image_path FROM problems WHERE image_path LIKE 'blobs/%'"
+            ).fetchall()
+        }
+
+    cutoff = time.time() - GC_GRACE_SECONDS
+    removed = 0
+    for shard in BLOBS_DIR.iterdir():
+        if not shard.is_dir():
+            continue
+        for blob in shard.iterdir():
+            # Dot files are store_image's in-flight temp files
+            if blob.name.startswith("."):
+                continue
+            relative = f"blobs/{shard.name}/{blob.name}"
+            try:
+                if relative in referenced or blob.stat().st_mtime > cutoff:
+                    continue
+                blob.unlink()
+            except FileNotFoundError:
+                # Replaced or collected by a concurrent store or sweep
+                continue
+            release_derivatives([relative])
+            removed += 1
+
+    if removed:
+        logger.info("Image GC removed %d unreferenced blobs", removed)
+    return removed
@@ -1,109 +1,282 @@
+import asyncio
+import json
 import logging
-import shutil
+import os
+import threading
 from pathlib import Path
 
 from backend.config import IMAGES_DIR
-from backend.database import get_db
-from backend.services.extractor import extract_chapter
+from backend.database import get_db, run_db
+from backend.services import pdf_cache
+from backend.services.extractor import extract_chapter, extract_problem_images
+from backend.services.image_store import (
+    collect_garbage,
+    delete_chapter_images,
+    release_images,
+)
+from backend.utils.fingerprint import file_fingerprint, is_unchanged
 
 logger = logging.getLogger(__name__)
 
 
-def check_chapter_integrity(chapter_id: int) -> dict:
+# Directory path -> (directory mtime_ns, {file name: (size, mtime_ns)})
+_manifests: dict[str, tuple[int, dict[str, tuple[int, int]]]] = {}
+_manifest_lock = threading.Lock()
+
+_IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png")
+
+
+def _scan_dir(directory: Path) -> dict[str, tuple[int, int]]:
+    """Return {name: (size, mtime_ns)} for the files in a directory.
+
+    Adding, removing or replacing a file (image_store writes via rename)
+    changes the directory's mtime, so an unchanged mtime means the
+    cached manifest is still valid and the scan is skipped.
+    """
+    try:
+        dir_mtime = directory.stat().st_mtime_ns
+    except FileNotFoundError:
+        return {}
+
+    key = str(directory)
+    with _manifest_lock:
+        cached = _manifests.get(key)
+    if cached is not None and cached[0] == dir_mtime:
+        return cached[1]
+
+    files: dict[str, tuple[int, int]] = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False):
+                stat = entry.stat(follow_symlinks=False)
+                files[entry.name] = (stat.st_size, stat.st_mtime_ns)
+
+    with _manifest_lock:
+        _manifests[key] = (dir_mtime, files)
+    return files
+
+
+def _check(where: str = "", params: tuple = ()) -> list[dict]:
+    """Check the chapters matching ``where`` and store the results.
+
+    One query loads every problem, then each directory holding images
+    (blob shards and legacy chapter dirs) is scanned once. An image is
+    missing if its file is absent or its size differs from the size
+    recorded at extraction.
+    """
+    with get_db() as db:
+        rows = db.execute(
+            "SELECT c.id AS chapter_id, c.problem_set_id, c.name, "
+            "p.number, p.image_path, p.file_size "
+            "FROM chapters c "
+            "LEFT JOIN problems p ON p.chapter_id = c.id "
+            f"{where} "
+            "ORDER BY c.problem_set_id, c.sort_order, p.number",
+            params,
+        ).fetchall()
+
+    chapters: dict[int, dict] = {}
+    for row in rows:
+        chapter = chapters.setdefault(row["chapter_id"], {
+            "chapter_id": row["chapter_id"],
+            "problem_set_id": row["problem_set_id"],
+            "name": row["name"],
+            "problems": [],
+        })
+        if row["number"] is not None:
+            chapter["problems"].append(row)
+
+    results = []
+    for chapter in chapters.values():
+        missing_files = []
+        present = 0
+        expected_legacy = set()
+        for p in chapter["problems"]:
+            image_path = Path(p["image_path"])
+            files = _scan_dir(IMAGES_DIR / image_path.parent)
+            entry = files.get(image_path.name)
+            if entry is None or (p["file_size"] and entry[0] != p["file_size"]):
+                missing_files.append(p["number"])
+            else:
+                present += 1
+            expected_legacy.add(p["image_path"])
+
+        # Orphans: files left in the legacy per-chapter directory but not in DB
+        legacy_dir = f"{chapter['problem_set_id']}/{chapter['chapter_id']}"
+        orphan_files = sorted(
+            name
+            for name in _scan_dir(IMAGES_DIR / legacy_dir)
+            if name.lower().endswith(_IMAGE_SUFFIXES)
+            and f"{legacy_dir}/{name}" not in expected_legacy
+        )
+
+        results.append({
+            "chapter_id": chapter["chapter_id"],
+            "name": chapter["name"],
+            "problem_set_id": chapter["problem_set_id"],
+            "problem_count": len(chapter["problems"]),
+            "image_count": present + len(orphan_files),
+            "missing_files": missing_files,
+            "orphan_files": orphan_files,
+            "healthy": not missing_files and not orphan_files,
+        })
+
+    _store_results(results)
+    return results
+
+
+def _store_results(results: list[dict]) -> None:
+    with get_db() as db:
+        db.executemany(
+            """INSERT OR REPLACE INTO integrity_results
+               (chapter_id, problem_count, image_count, missing_files, orphan_files, healthy)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            [
+                (
+                    r["chapter_id"],
+                    r["problem_count"],
+                    r["image_count"],
+                    json.dumps(r["missing_files"]),
+                    json.dumps(r["orphan_files"], ensure_ascii=False),
+                    r["healthy"],
+                )
+                for r in results
+            ],
+        )
+        # Shown as the chapter's image count until the next check
+        db.executemany(
+            "UPDATE chapters SET missing_images = ? WHERE id = ?",
+            [(len(r["missing_files"]), r["chapter_id"]) for r in results],
+        )
+
+
+def _cached(where: str, params: tuple) -> list[dict]:
+    with get_db() as db:
+        rows = db.execute(
+            "SELECT c.id AS chapter_id, c.name, c.problem_set_id, r.problem_count, "
+            "r.image_count, r.missing_files, r.orphan_files, r.healthy, r.checked_at "
+            "FROM chapters c "
+            "LEFT JOIN integrity_results r ON r.chapter_id = c.id "
+            f"{where} "
+            "ORDER BY c.sort_order",
+            params,
+        ).fetchall()
+
+    return [
+        {
+            "chapter_id": row["chapter_id"],
+            "name": row["name"],
+            "problem_set_id": row["problem_set_id"],
+            "problem_count": row["problem_count"],
+            "image_count": row["image_count"],
+            "missing_files": json.loads(row["missing_files"]),
+            "orphan_files": json.loads(row["orphan_files"]),
+            "healthy": bool(row["healthy"]),
+            "checked_at": row["checked_at"],
+        }
+        if row["checked_at"] is not None
+        else None
+        for row in rows
+    ]
+
+
+def check_library_integrity() -> int:
+    """Check every chapter in the library. Returns the number of unhealthy chapters."""
+    results = _check()
+    unhealthy = sum(1 for r in results if not r["healthy"])
+    if unhealthy:
+        logger.warning(
+            "Integrity sweep: %d of %d chapters unhealthy", unhealthy, len(results)
+        )
+    return unhealthy
+
+
+def check_chapter_integrity(chapter_id: int, refresh: bool = False) -> dict:
     """Check if DB records match actual image files for a chapter.
 
-    Returns:
+    Returns the stored verdict of the last check unless ``refresh`` is
+    set or the chapter changed since:
         {
             "chapter_id": int,
             "problem_count": int,      # DB records
             "image_count": int,        # actual files on disk
             "missing_files": [int],    # problem numbers with DB record but no file
-            "orphan_files": [str],     # files on disk with no DB record
+            "orphan_files": [str],     # legacy chapter-dir files with no DB record
             "healthy": bool,
+            "checked_at": str,
         }
     """
-    with get_db() as db:
-        chapter = db.execute(
-            "SELECT c.id, c.problem_set_id FROM chapters c WHERE c.id = ?",
-            (chapter_id,),
-        ).fetchone()
-        if not chapter:
+    result = None
+    if not refresh:
+        cached = _cached("WHERE c.id = ?", (chapter_id,))
+        if not cached:
             return {"error": "chapter not found"}
+        result = cached[0]
 
-        problems = db.execute(
-            "SELECT number, image_path FROM problems WHERE chapter_id = ?",
-            (chapter_id,),
-        ).fetchall()
+    if result is None:
+        checked = _check("WHERE c.id = ?", (chapter_id,))
+        if not checked:
+            return {"error": "chapter not found"}
+        result = _cached("WHERE c.id = ?", (chapter_id,))[0]
 
-    problem_set_id = chapter["problem_set_id"]
-    chapter_dir = IMAGES_DIR / str(problem_set_id) / str(chapter_id)
-
-    # DB side
-    db_numbers = {}
-    for p in problems:
-        db_numbers[p["number"]] = p["image_path"]
-
-    # Filesystem side
-    disk_files = set()
-    if chapter_dir.is_dir():
-        for f in chapter_dir.iterdir():
-            if f.is_file() and f.suffix.lower() in (".jpg", ".jpeg", ".png"):
-                disk_files.add(f.name)
-
-    # Check missing (in DB but not on disk)
-    missing_files = []
-    for num, img_path in db_numbers.items():
-        expected_file = Path(img_path).name
-        if expected_file not in disk_files:
-            missing_files.append(num)
-
-    # Check orphans (on disk but not in DB)
-    expected_names = {Path(p).name for p in db_numbers.values()}
-    orphan_files = [f for f in sorted(disk_files) if f not in expected_names]
+    result.pop("name")
+    result.pop("problem_set_id")
+    return result
 
-    return {
-        "chapter_id": chapter_id,
-        "problem_count": len(db_numbers),
-        "image_count": len(disk_files),
-        "missing_files": sorted(missing_files),
-        "orphan_files": orphan_files,
-        "healthy": len(missing_files) == 0 and len(orphan_files) == 0,
-    }
 
+def check_problem_set_integrity(problem_set_id: int, refresh: bool = False) -> dict:
+    """Check integrity of all chapters in a problem set.
 
-def check_problem_set_integrity(problem_set_id: int) -> dict:
-    """Check integrity of all chapters in a problem set."""
-    with get_db() as db:
-        chapters = db.execute(
-            "SELECT id, name FROM chapters WHERE problem_set_id = ? ORDER BY sort_order",
-            (problem_set_id,),
-        ).fetchall()
+    Stored verdicts are returned as-is; only chapters without one (or all
+    of them, with ``refresh``) are checked now.
+    """
+    results = [] if refresh else _cached("WHERE c.problem_set_id = ?", (problem_set_id,))
+    if refresh or any(r is None for r in results):
+        _check("WHERE c.problem_set_id = ?", (problem_set_id,))
+        results = _cached("WHERE c.problem_set_id = ?", (problem_set_id,))
 
-    results = []
-    all_healthy = True
-    for ch in chapters:
-        result = check_chapter_integrity(ch["id"])
-        result["name"] = ch["name"]
-        results.append(result)
-        if not result.get("healthy", False):
-            all_healthy = False
+    for result in results:
+        result.pop("problem_set_id")
 
     return {
         "problem_set_id": problem_set_id,
         "chapters": results,
-        "all_healthy": all_healthy,
+        "all_healthy": all(r["healthy"] for r in results),
     }
 
 
-def repair_chapter(chapter_id: int) -> dict:
+async def run_integrity_sweeps(interval: float) -> None:
+    """Re-check the whole library every ``interval`` seconds, storing verdicts.
+
+    Each sweep also collects blobs that ``release_images`` left behind
+    because they were stored too recently.
+    """
+    while True:
+        try:
+            await run_db(check_library_integrity)
+            await run_db(collect_garbage)
+        except Exception:
+            logger.exception("Integrity sweep failed")
+        await asyncio.sleep(interval)
+
+
+def repair_chapter(chapter_id: int, mode: str = "missing") -> dict:
     """Re-extract a chapter from its source PDF.
 
-    Completely replaces all images and DB records for this chapter.
+    mode="missing" re-extracts only the problems whose image is missing,
+    from their stored page and bbox; rows (and any renumbering) are kept.
+    It falls back to a full repair if the source PDF changed since
+    extraction or a missing problem has no stored bbox.
+    mode="full" completely replaces all images and DB records.
     Returns extraction result summary.
     """
+    if mode not in ("missing", "full"):
+        raise ValueError(f"Unknown repair mode: {mode}")
+
     with get_db() as db:
         chapter = db.execute(
-            """SELECT c.id, c.problem_set_id, c.source_filename, ps.source_path
+            """SELECT c.id, c.problem_set_id, c.source_filename, c.source_size,
+                      c.source_mtime, c.source_hash, ps.source_path
                FROM chapters c
                JOIN problem_sets ps ON c.problem_set_id = ps.id
                WHERE c.id = ?""",
@@ -112,67 +285,172 @@ def repair_chapter(chapter_id: int) -> dict:
         if not chapter:
             raise ValueError(f"Chapter {chapter_id} not found")
 
-    problem_set_id = chapter["problem_set_id"]
-    source_filename = chapter["source_filename"]
     source_path = Path(chapter["source_path"])
-    pdf_path = source_path / source_filename
+    pdf_path = source_path / chapter["source_filename"]
 
     if not pdf_path.is_file():
         raise FileNotFoundError(f"소스 PDF를 찾을 수 없습니다: {pdf_path}")
 
-    output_dir = IMAGES_DIR / str(problem_set_id) / str(chapter_id)
+    if mode == "missing":
+        result = _repair_missing(chapter, pdf_path)
+        if result is not None:
+            return result
+
+    return _repair_full(chapter, pdf_path)
+
+
+def _repair_missing(chapter, pdf_path: Path) -> dict | None:
+    """Re-extract only the missing images of a chapter.
 
-    # Clean up existing data
+    Returns None when a targeted repair is not possible.
+    """
+    chapter_id = chapter["id"]
+    unchanged, _ = is_unchanged(
+        pdf_path,
+        {
+            "size": chapter["source_size"],
+            "mtime": chapter["source_mtime"],
+            "hash": chapter["source_hash"],
+        },
+    )
+    if not unchanged:
+        return None
+
+    check = _check("WHERE c.id = ?", (chapter_id,))[0]
+    missing = check["missing_files"]
     with get_db() as db:
-        deleted_count = db.execute(
-            "DELETE FROM problems WHERE chapter_id = ?", (chapter_id,)
-        ).rowcount
-        db.commit()
+        rows = db.execute(
+            """SELECT id, number, image_path, page_num, bbox_x0, bbox_y0, bbox_x1, bbox_y1
+               FROM problems
+               WHERE chapter_id = ? AND number IN (SELECT value FROM json_each(?))
+               ORDER BY number""",
+            (chapter_id, json.dumps(missing)),
+        ).fetchall()
+        problem_count = db.execute(
+            "SELECT COUNT(*) FROM problems WHERE chapter_id = ?", (chapter_id,)
+        ).fetchone()[0]
+
+    if any(row["page_num"] is None or row["bbox_x0"] is None for row in rows):
+        return None
+
+    extracted = extract_problem_images(
+        str(pdf_path),
+        [
+            (
+                row["page_num"],
+                (row["bbox_x0"], row["bbox_y0"], row["bbox_x1"], row["bbox_y1"]),
+            )
+            for row in rows
+        ],
+    )
+    if any(image is None for image in extracted):
+        return None
 
-    # Clean up existing files (but keep the directory)
-    if output_dir.exists():
-        staging = output_dir / ".staging"
-        if staging.exists():
-            shutil.rmtree(staging, ignore_errors=True)
-        for f in output_dir.iterdir():
-            if f.is_file():
-                f.unlink()
+    # Orphans live in the chapter's legacy directory, which no other
+    # chapter references
+    legacy_dir = IMAGES_DIR / str(chapter["problem_set_id"]) / str(chapter_id)
+    for name in check["orphan_files"]:
+        (legacy_dir / name).unlink(missing_ok=True)
 
-    output_dir.mkdir(parents=True, exist_ok=True)
+    if rows:
+        with get_db() as db:
+            db.executemany(
+                "UPDATE problems SET image_path = ?, file_size = ? WHERE id = ?",
+                [
+                    (image["image_path"], image["file_size"], row["id"])
+                    for row, image in zip(rows, extracted)
+                ],
+            )
+            db.commit()
+
+        release_images(
+            row["image_path"]
+            for row, image in zip(rows, extracted)
+            if row["image_path"] != image["image_path"]
+        )
+        pdf_cache.invalidate_chapter(chapter_id)
 
-    # Re-extract
-    count = 0
+    if rows or check["orphan_files"]:
+        # Store a fresh verdict (and missing_images) for the repaired chapter
+        _check("WHERE c.id = ?", (chapter_id,))
+
+    logger.info(
+        "Repaired chapter %d: %d missing problems re-extracted", chapter_id, len(rows)
+    )
+
+    return {
+        "chapter_id": chapter_id,
+        "mode": "missing",
+        "deleted_records": 0,
+        "extracted_count": len(rows),
+        "image_files": problem_count,
+        "repaired_numbers": [row["number"] for row in rows],
+    }
+
+
+def _repair_full(chapter, pdf_path: Path) -> dict:
+    """Replace all images and DB records of a chapter."""
+    chapter_id = chapter["id"]
+    problem_set_id = chapter["problem_set_id"]
+
+    # Re-extract; unchanged images dedupe to the blobs already stored
     with get_db() as db:
-        for prob in extract_chapter(str(pdf_path), output_dir):
-            image_path = f"{problem_set_id}/{chapter_id}/{prob['filename']}"
+        old_paths = [
+            row["image_path"]
+            for row in db.execute(
+                "SELECT image_path FROM problems WHERE chapter_id = ?", (chapter_id,)
+            ).fetchall()
+        ]
+        deleted_count = db.execute(
+            "DELETE FROM problems WHERE chapter_id = ?", (chapter_id,)
+        ).rowcount
+
+        count = 0
+        for prob in extract_chapter(str(pdf_path)):
             db.execute(
                 """INSERT INTO problems
-                   (chapter_id, number, image_path, width, height, file_size, page_num, column_pos)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                   (chapter_id, number, image_path, width, height, file_size, page_num, column_pos,
+                    bbox_x0, bbox_y0, bbox_x1, bbox_y1)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
                 (
                     chapter_id,
                     prob["number"],
-                    image_path,
+                    prob["image_path"],
                     prob["width"],
                     prob["height"],
                     prob["file_size"],
                     prob["page_num"],
                     prob["column_pos"],
+                    *prob["bbox"],
                 ),
             )
             count += 1
 
+        fingerprint = file_fingerprint(pdf_path)
         db.execute(
-            "UPDATE chapters SET total_problems = ? WHERE id = ?",
-            (count, chapter_id),
+            """UPDATE chapters
+               SET missing_images = 0, source_size = ?, source_mtime = ?, source_hash = ?
+               WHERE id = ?""",
+            (
+                fingerprint["size"],
+                fingerprint["mtime"],
+                fingerprint["hash"],
+                chapter_id,
+            ),
         )
         db.commit()
 
+    # Drop images nothing references any more, and the legacy chapter
+    # directory this chapter no longer uses
+    delete_chapter_images(problem_set_id, chapter_id, old_paths)
+    pdf_cache.invalidate_chapter(chapter_id)
+
     logger.info("Repaired chapter %d: %d problems extracted", chapter_id, count)
 
     return {
         "chapter_id": chapter_id,
+        "mode": "full",
         "deleted_records": deleted_count,
         "extracted_count": count,
-        "image_files": len(list(output_dir.glob("*.jpg"))),
+        "image_files": count,
     }
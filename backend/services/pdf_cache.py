@@ -0,0 +1,110 @@
+"""Cache of generated wrong-answer PDFs in PDF_OUTPUT_DIR.
+
+Output filenames embed a key derived from everything that affects the
+rendered pages (set ids, layout options and the fetched set data,
+including image paths), so a stale file can never be returned; a
+changed input simply produces a new key. Explicit invalidation only
+frees disk early. Files are evicted least-recently-used (by mtime,
+refreshed on every hit) once the directory exceeds PDF_CACHE_MAX_BYTES.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Iterable
+
+from backend.config import PDF_CACHE_MAX_BYTES, PDF_OUTPUT_DIR
+from backend.database import get_db
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+# Batch filename -> set ids it contains, for invalidation by set id.
+# Single-set files carry their set id in the filename instead.
+_batch_sets: dict[str, set[int]] = {}
+
+
+def cache_key(set_data: list[dict], **options) -> str:
+    """Return a short digest of the fetched set data and layout options."""
+    payload = json.dumps(
+        {"sets": set_data, "options": options},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def lookup(filename: str) -> bool:
+    """Return True if a cached file exists, marking it recently used."""
+    filepath = PDF_OUTPUT_DIR / filename
+    try:
+        os.utime(filepath)
+    except FileNotFoundError:
+        return False
+    logger.debug("PDF cache hit: %s", filename)
+    return True
+
+
+def store(filename: str, set_ids: Iterable[int], batch: bool = False) -> None:
+    """Register a freshly written file and enforce the size budget."""
+    if batch:
+        with _lock:
+            _batch_sets[filename] = set(set_ids)
+    _evict(keep=filename)
+
+
+def invalidate_sets(set_ids: Iterable[int]) -> None:
+    """Delete cached files that include any of the given sets."""
+    ids = set(set_ids)
+    if not ids:
+        return
+
+    doomed = []
+    for set_id in ids:
+        doomed.extend(PDF_OUTPUT_DIR.glob(f"wrong_answers_{set_id}_*.pdf"))
+    with _lock:
+        for filename, members in list(_batch_sets.items()):
+            if members & ids:
+                doomed.append(PDF_OUTPUT_DIR / filename)
+                del _batch_sets[filename]
+
+    for filepath in doomed:
+        filepath.unlink(missing_ok=True)
+
+
+def invalidate_chapter(chapter_id: int) -> None:
+    """Delete cached files of every set with wrong answers in a chapter."""
+    with get_db() as db:
+        rows = db.execute(
+            "SELECT DISTINCT wrong_answer_set_id FROM wrong_answer_items WHERE chapter_id = ?",
+            (chapter_id,),
+        ).fetchall()
+    invalidate_sets(row["wrong_answer_set_id"] for row in rows)
+
+
+def _evict(keep: str) -> None:
+    files = []
+    total = 0
+    for entry in os.scandir(PDF_OUTPUT_DIR):
+        if entry.is_file() and entry.name.endswith(".pdf") and entry.name != keep:
+            stat = entry.stat()
+            files.append((stat.st_mtime, stat.st_size, entry.name))
+            total += stat.st_size
+
+    if total <= PDF_CACHE_MAX_BYTES:
+        return
+
+    files.sort()
+    for _, size, name in files:
+        if total <= PDF_CACHE_MAX_BYTES:
+            break
+        (PDF_OUTPUT_DIR / name).unlink(missing_ok=True)
+        with _lock:
+            _batch_sets.pop(name, None)
+        total -= size
+        logger.info("Evicted cached PDF %s (%d bytes)", name, size)
@@ -8,16 +8,36 @@ Column width: (210 - 10.5 - 10.5 - 5.6) / 2 = 91.7mm.
 
 from __future__ import annotations
 
+import copy
+import functools
 import json
 import logging
+import math
+import os
 import platform
-import uuid
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+from typing import Callable, NamedTuple
 
+import fitz
+from fontTools import ttLib
 from fpdf import FPDF
-
-from backend.config import IMAGES_DIR, PDF_OUTPUT_DIR
+from fpdf.fonts import SubsetMap, TTFFont
+from fpdf.image_parsing import get_img_info
+
+from backend.config import (
+    IMAGES_DIR,
+    PDF_IMAGE_CACHE_BYTES,
+    PDF_OUTPUT_DIR,
+    PDF_WORKERS,
+    PRINT_DPI,
+)
 from backend.database import get_db
+from backend.services import pdf_cache
+from backend.services.image_derivatives import get_print_image
 
 logger = logging.getLogger(__name__)
 
@@ -38,15 +58,30 @@ HEADER_FONT_SIZE = 9
 PROBLEM_LABEL_HEIGHT = 5.0  # mm for "N번" label above each image
 PROBLEM_LABEL_FONT_SIZE = 8
 DIVIDER_FONT_SIZE = 28
+SECTION_HEADER_HEIGHT = 7.0  # mm for inline chapter headers (compact layout)
+SECTION_HEADER_FONT_SIZE = 8.5
 
 USABLE_HEIGHT = PAGE_H - MARGIN_TOP - MARGIN_BOTTOM  # ~269mm
 
+# Pixel width of an image printed at column width and PRINT_DPI
+PRINT_WIDTH_PX = math.ceil(COLUMN_WIDTH / 25.4 * PRINT_DPI)
+
+_process_pool: ProcessPoolExecutor | None = None
+
+# Called with (students_done, total_students) while a batch renders
+ProgressCallback = Callable[[int, int], None]
+
+
+class GenerationCancelled(Exception):
+    """Raised when a batch render is cancelled through its cancel event."""
+
 
 # ---------------------------------------------------------------------------
 # Korean font discovery
 # ---------------------------------------------------------------------------
+@functools.lru_cache(maxsize=1)
 def _find_korean_font() -> str | None:
-    """Find a Korean font file on the system."""
+    """Find a Korean font file on the system (once per process)."""
     candidates: list[str] = []
 
     if platform.system() == "Darwin":
@@ -73,6 +108,109 @@ def _find_korean_font() -> str | None:
     return None
 
 
+# ---------------------------------------------------------------------------
+# Process-wide font and image caches
+# ---------------------------------------------------------------------------
+# Parsing the Korean font's cmap and width tables dominates document setup,
+# and fpdf2 re-reads every image on each new document. Both are kept per
+# process, keyed by file path, mtime and size so a replaced file is re-read
+# (content-addressed images by path and size only).
+
+# (path, style, mtime_ns, size) -> parsed TTFFont used as a template.
+# Copies reset per-document TTFFont fields, which are fpdf2 internals; if
+# that fails, fonts are added with plain add_font for the rest of the run.
+_font_templates: dict[tuple, TTFFont] = {}
+_font_lock = threading.Lock()
+_font_cache_disabled = False
+
+# (path, [mtime_ns,] size, image_filter) -> fpdf2 image info (includes the
+# encoded data), least recently used first
+_image_infos: OrderedDict[tuple, dict] = OrderedDict()
+_image_infos_bytes = 0
+_image_lock = threading.Lock()
+
+
+def _file_key(path: str) -> tuple:
+    stat = os.stat(path)
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+
+def _image_key(image_path: str) -> tuple:
+    path = Path(image_path)
+    parts = path.relative_to(IMAGES_DIR).parts if path.is_relative_to(IMAGES_DIR) else ()
+    if "blobs" in parts:
+        # Blobs and their derivatives never change under the same name;
+        # storing the same bytes again only touches the blob's mtime
+        return (image_path, path.stat().st_size)
+    return _file_key(image_path)
+
+
+def _cached_font(pdf: FPDF, font_path: str, style: str) -> TTFFont:
+    """Return a TTFFont for ``pdf``, parsing the file at most once per process.
+
+    The copy shares the template's read-only metrics but gets its own
+    subset map and fontTools handle, since output subsets the font in place.
+    """
+    path, mtime_ns, size = _file_key(font_path)
+    key = (path, style, mtime_ns, size)
+    fontkey = f"korean{style}"  # as FPDF.add_font("Korean", style) names it
+    with _font_lock:
+        template = _font_templates.get(key)
+        if template is None:
+            template = TTFFont(pdf, Path(font_path), fontkey, style)
+            _font_templates[key] = template
+
+    font = copy.copy(template)
+    font.i = len(pdf.fonts) + 1
+    font.ttfont = ttLib.TTFont(
+        font.ttffile,
+        recalcTimestamp=False,
+        fontNumber=font.collection_font_number,
+        lazy=True,
+    )
+    font.subset = SubsetMap(font)
+    font.missing_glyphs = []
+    font.biggest_size_pt = 0
+    font._hbfont = None
+    return font
+
+
+def _info_size(info: dict) -> int:
+    return len(info["data"]) + len(info.get("smask") or b"")
+
+
+def _cached_image_info(image_path: str, image_filter: str) -> dict:
+    """Return fpdf2's parsed info for an image, reusing it across documents."""
+    global _image_infos_bytes
+    key = _image_key(image_path) + (image_filter,)
+    with _image_lock:
+        info = _image_infos.get(key)
+        if info is not None:
+            _image_infos.move_to_end(key)
+            return info
+
+    info = get_img_info(image_path, image_filter=image_filter)
+    size = _info_size(info)
+    if size > PDF_IMAGE_CACHE_BYTES:
+        return info
+    with _image_lock:
+        if key not in _image_infos:
+            _image_infos[key] = info
+            _image_infos_bytes += size
+        while _image_infos_bytes > PDF_IMAGE_CACHE_BYTES:
+            _, evicted = _image_infos.popitem(last=False)
+            _image_infos_bytes -= _info_size(evicted)
+    return info
+
+
+def warm_up() -> None:
+    """Parse the Korean font ahead of the first generation.
+
+    Called at startup and in each PDF worker process.
+    """
+    _WrongAnswerPDF()
+
+
 # ---------------------------------------------------------------------------
 # PDF builder helper
 # ---------------------------------------------------------------------------
@@ -83,14 +221,15 @@ class _WrongAnswerPDF(FPDF):
         super().__init__(orientation="P", unit="mm", format="A4")
         self.set_auto_page_break(auto=False)
         self._korean_ready = False
+        # image path -> {"size": bytes on disk, "placements": count}
+        self._image_registry: dict[str, dict] = {}
         self._setup_font()
 
     def _setup_font(self) -> None:
         font_path = _find_korean_font()
         if font_path:
             try:
-                self.add_font("Korean", "", font_path)
-                self.add_font("Korean", "B", font_path)
+                self._add_korean_fonts(font_path)
                 self._korean_ready = True
                 logger.debug("Korean font loaded from %s", font_path)
             except Exception:
@@ -102,209 +241,526 @@ class _WrongAnswerPDF(FPDF):
         if not self._korean_ready:
             logger.info("No Korean font found, using Helvetica (Korean text may not render)")
 
+    def _add_korean_fonts(self, font_path: str) -> None:
+        """Add the regular and bold Korean fonts, from the font cache if possible."""
+        global _font_cache_disabled
+        if not _font_cache_disabled:
+            try:
+                # One at a time: each copy's font number counts the fonts added so far
+                for style in ("", "B"):
+                    font = _cached_font(self, font_path, style)
+                    self.fonts[font.fontkey] = font
+                    if font.is_cff and font.is_cid_keyed:
+                        self._set_min_pdf_version("1.6")
+            except Exception:
+                _font_cache_disabled = True
+                self.fonts.pop("korean", None)
+                self.fonts.pop("koreanB", None)
+                logger.warning(
+                    "Font cache unavailable, parsing %s for every PDF",
+                    font_path,
+                    exc_info=True,
+                )
+            else:
+                return
+
+        self.add_font("Korean", "", font_path)
+        self.add_font("Korean", "B", font_path)
+
     def _set_font(self, size: float, bold: bool = False) -> None:
         if self._korean_ready:
             self.set_font("Korean", "B" if bold else "", size)
         else:
             self.set_font("Helvetica", "B" if bold else "", size)
 
+    def _place_image(self, image_path: str, x: float, y: float, w: float) -> None:
+        """Place an image, embedding each distinct file only once.
+
+        fpdf2 keys its image cache by the name passed in, so every
+        placement of the same path reuses the first XObject. Image paths
+        are content-addressed, so identical problems share a path. The
+        parsed image comes from the process-wide cache and is registered
+        under that name before fpdf2 looks it up.
+        """
+        entry = self._image_registry.get(image_path)
+        if entry is None:
+            entry = {"size": Path(image_path).stat().st_size, "placements": 0}
+            self._image_registry[image_path] = entry
+            self._register_image(image_path)
+        entry["placements"] += 1
+        self.image(image_path, x=x, y=y, w=w)
+
+    def _register_image(self, image_path: str) -> None:
+        """Add a per-document copy of the cached info, as fpdf2's preload_image would."""
+        cache = self.image_cache
+        info = copy.copy(_cached_image_info(image_path, cache.image_filter))
+        info["i"] = len(cache.images) + 1
+        info["usages"] = 0
+        info["iccp_i"] = None
+        iccp = info.get("iccp")
+        if iccp is not None:
+            info["iccp_i"] = cache.icc_profiles.setdefault(iccp, len(cache.icc_profiles))
+            info["iccp"] = None
+        cache.images[image_path] = info
+
+    def _dedup_stats(self) -> dict:
+        """Return unique images, placements and bytes saved by reuse."""
+        entries = self._image_registry.values()
+        return {
+            "unique_images": len(self._image_registry),
+            "placements": sum(e["placements"] for e in entries),
+            "saved_bytes": sum(e["size"] * (e["placements"] - 1) for e in entries),
+        }
+
 
 # ---------------------------------------------------------------------------
 # Data fetching helpers
 # ---------------------------------------------------------------------------
-def _fetch_set_data(wrong_answer_set_id: int) -> dict:
-    """Fetch all needed data for a single wrong answer set.
-
-    Returns dict with keys:
-        student_name, set_title, items: list of {
-            problem_set_name, chapter_name, chapter_id,
-            problem_set_id, number, image_path, width, height
-        }
+class LayoutItem(NamedTuple):
+    """One problem to place; a tuple keeps batches of thousands small."""
+
+    problem_set_name: str
+    chapter_name: str
+    chapter_id: int
+    problem_set_id: int
+    number: int
+    image_path: str
+    image_exists: bool
+    width: int
+    height: int
+
+
+def _fetch_sets_data(wrong_answer_set_ids: list[int]) -> list[dict]:
+    """Fetch everything needed to lay out the given wrong answer sets.
+
+    Runs two queries regardless of how many sets or problems there are:
+    one for the sets and one joining their wrong_answer_items to the
+    problems. Item image paths are relative to IMAGES_DIR until
+    _resolve_print_images is applied.
+
+    Returns one dict per requested id, in order, with keys:
+        student_name, set_title, items: list[LayoutItem]
     """
+    ids_json = json.dumps(wrong_answer_set_ids)
+
     with get_db() as db:
-        ws_row = db.execute(
+        set_rows = db.execute(
             "SELECT ws.id, ws.title, s.name AS student_name "
             "FROM wrong_answer_sets ws "
             "JOIN students s ON s.id = ws.student_id "
-            "WHERE ws.id = ?",
-            (wrong_answer_set_id,),
-        ).fetchone()
-        if not ws_row:
-            raise ValueError(f"Wrong answer set {wrong_answer_set_id} not found")
-
-        entry_rows = db.execute(
-            "SELECT wa.chapter_id, wa.problem_numbers, "
+            "WHERE ws.id IN (SELECT value FROM json_each(?))",
+            (ids_json,),
+        ).fetchall()
+
+        item_rows = db.execute(
+            "SELECT i.wrong_answer_set_id, i.chapter_id, "
             "c.name AS chapter_name, c.problem_set_id, "
-            "ps.name AS problem_set_name "
-            "FROM wrong_answers wa "
-            "JOIN chapters c ON c.id = wa.chapter_id "
+            "ps.name AS problem_set_name, i.number, "
+            "p.image_path, p.width, p.height "
+            "FROM wrong_answer_items i "
+            "JOIN chapters c ON c.id = i.chapter_id "
             "JOIN problem_sets ps ON ps.id = c.problem_set_id "
-            "WHERE wa.wrong_answer_set_id = ? "
-            "ORDER BY ps.name, c.name",
-            (wrong_answer_set_id,),
+            "LEFT JOIN problems p ON p.chapter_id = i.chapter_id AND p.number = i.number "
+            "WHERE i.wrong_answer_set_id IN (SELECT value FROM json_each(?)) "
+            "ORDER BY i.wrong_answer_set_id, ps.name, c.name, i.number",
+            (ids_json,),
         ).fetchall()
 
-        items: list[dict] = []
-        for entry in entry_rows:
-            numbers = json.loads(entry["problem_numbers"])
-            for num in sorted(numbers):
-                problem = db.execute(
-                    "SELECT image_path, width, height "
-                    "FROM problems "
-                    "WHERE chapter_id = ? AND number = ?",
-                    (entry["chapter_id"], num),
-                ).fetchone()
-                if not problem:
-                    logger.warning(
-                        "Problem ch=%d num=%d not found, skipping",
-                        entry["chapter_id"],
-                        num,
-                    )
-                    continue
-                items.append(
-                    {
-                        "problem_set_name": entry["problem_set_name"],
-                        "chapter_name": entry["chapter_name"],
-                        "chapter_id": entry["chapter_id"],
-                        "problem_set_id": entry["problem_set_id"],
-                        "number": num,
-                        "image_path": str(IMAGES_DIR / problem["image_path"]),
-                        "width": problem["width"],
-                        "height": problem["height"],
-                    }
-                )
+    sets = {row["id"]: row for row in set_rows}
+    for set_id in wrong_answer_set_ids:
+        if set_id not in sets:
+            raise ValueError(f"Wrong answer set {set_id} not found")
+
+    items_by_set: dict[int, list[LayoutItem]] = {set_id: [] for set_id in sets}
+    for row in item_rows:
+        if row["image_path"] is None:
+            logger.warning(
+                "Problem ch=%d num=%d not found, skipping",
+                row["chapter_id"],
+                row["number"],
+            )
+            continue
+
+        items_by_set[row["wrong_answer_set_id"]].append(
+            LayoutItem(
+                problem_set_name=row["problem_set_name"],
+                chapter_name=row["chapter_name"],
+                chapter_id=row["chapter_id"],
+                problem_set_id=row["problem_set_id"],
+                number=row["number"],
+                image_path=row["image_path"],
+                image_exists=True,
+                width=row["width"],
+                height=row["height"],
+            )
+        )
 
-    return {
-        "student_name": ws_row["student_name"],
-        "set_title": ws_row["title"] or "",
-        "items": items,
-    }
+    return [
+        {
+            "student_name": sets[set_id]["student_name"],
+            "set_title": sets[set_id]["title"] or "",
+            "items": items_by_set[set_id],
+        }
+        for set_id in wrong_answer_set_ids
+    ]
+
+
+def _resolve_print_images(set_data: list[dict], print_profile: str) -> list[dict]:
+    """Point items at the print-resolution copies the renderer embeds.
+
+    Each distinct image is converted once (see get_print_image); items
+    whose image is missing get image_exists=False.
+    """
+    # image path -> print copy, or None if the image is missing
+    print_images: dict[str, Path | None] = {}
+    resolved = []
+    for data in set_data:
+        items = []
+        for item in data["items"]:
+            image_path = item.image_path
+            if image_path not in print_images:
+                print_images[image_path] = get_print_image(
+                    image_path, PRINT_WIDTH_PX, print_profile
+                )
+            print_image = print_images[image_path]
+            items.append(
+                item._replace(
+                    image_path=str(print_image or IMAGES_DIR / image_path),
+                    image_exists=print_image is not None,
+                )
+            )
+        resolved.append({**data, "items": items})
+    return resolved
 
 
 # ---------------------------------------------------------------------------
 # Layout engine
 # ---------------------------------------------------------------------------
-def _layout_items(
-    pdf: _WrongAnswerPDF,
-    items: list[dict],
+class Placement(NamedTuple):
+    """Where one item goes on the page; y is the top of its "N번" label."""
+
+    page: int  # 0-based within the layout
+    column: int
+    x: float
+    y: float
+    w: float
+    h: float  # image height
+    spacer: float
+
+
+class SectionHeader(NamedTuple):
+    """An inline chapter header drawn inside a column (compact layout)."""
+
+    page: int
+    x: float
+    y: float
+    text: str
+
+
+class LayoutPlan(NamedTuple):
+    """Pages of one layout: a header per page and a placement per item."""
+
+    headers: list[str]
+    placements: list[Placement]
+    sections: list[SectionHeader] = []
+
+
+def _block_size(
+    item: LayoutItem, spacer_ratio: float, max_height: float
+) -> tuple[float, float, float]:
+    """Return (image height, spacer, label + image + spacer) at column width.
+
+    The spacer is shrunk so the block never exceeds ``max_height``.
+    """
+    img_h = (item.height / item.width) * COLUMN_WIDTH if item.width > 0 else 40.0
+    spacer_h = img_h * spacer_ratio
+
+    total_block = PROBLEM_LABEL_HEIGHT + img_h + spacer_h
+    if total_block > max_height:
+        spacer_h = max(0, max_height - PROBLEM_LABEL_HEIGHT - img_h)
+        total_block = PROBLEM_LABEL_HEIGHT + img_h + spacer_h
+    return img_h, spacer_h, total_block
+
+
+def _column_x(col: int) -> float:
+    return MARGIN_LEFT if col == 0 else MARGIN_LEFT + COLUMN_WIDTH + COLUMN_GAP
+
+
+def _plan_layout(
+    items: list[LayoutItem],
     spacer_ratio: float,
     header_text_prefix: str,
-) -> None:
-    """Place problem images in 2-column layout across pages.
+) -> LayoutPlan:
+    """Plan the 2-column layout of ``items`` from their stored sizes alone.
 
     Each item gets:
     1. A problem label ("N번") above the image
     2. The image scaled to column width
     3. A spacer below equal to image_height * spacer_ratio
+
+    A new page starts whenever the header (problem set + chapter)
+    changes or the block fits in neither column.
     """
-    if not items:
-        return
+    headers: list[str] = []
+    placements: list[Placement] = []
 
     col = 0  # 0 = left, 1 = right
+    header_total = HEADER_HEIGHT + 2.0  # 2mm gap after header line
     y_pos = [0.0, 0.0]  # current y position per column
 
-    current_header = ""
-
-    def _col_x(c: int) -> float:
-        if c == 0:
-            return MARGIN_LEFT
-        return MARGIN_LEFT + COLUMN_WIDTH + COLUMN_GAP
+    # If even a fresh column on a new page can't fit a block, cap its spacer
+    max_col_height = USABLE_HEIGHT - header_total
 
     def _start_new_page(header: str) -> None:
-        nonlocal col, y_pos
-        pdf.add_page()
+        nonlocal col
+        headers.append(header)
         col = 0
-        y_pos = [MARGIN_TOP, MARGIN_TOP]
-        _draw_header(header)
-
-    def _draw_header(header: str) -> None:
-        nonlocal y_pos
-        pdf._set_font(HEADER_FONT_SIZE, bold=True)
-        pdf.set_xy(MARGIN_LEFT, MARGIN_TOP)
-        pdf.set_text_color(80, 80, 80)
-        pdf.cell(
-            PAGE_W - MARGIN_LEFT - MARGIN_RIGHT,
-            HEADER_HEIGHT,
-            header,
-            border="B",
-            align="L",
-        )
-        pdf.set_text_color(0, 0, 0)
-        header_total = HEADER_HEIGHT + 2.0  # 2mm gap after header line
-        y_pos[0] = MARGIN_TOP + header_total
-        y_pos[1] = MARGIN_TOP + header_total
+        y_pos[0] = y_pos[1] = MARGIN_TOP + header_total
 
-    def _available_height(c: int) -> float:
-        return PAGE_H - MARGIN_BOTTOM - y_pos[c]
+    def _fits(c: int, block: float) -> bool:
+        return PAGE_H - MARGIN_BOTTOM - y_pos[c] >= block
 
-    def _place_item(item: dict) -> None:
-        nonlocal col, y_pos, current_header
+    for item in items:
+        header = f"{header_text_prefix}{item.problem_set_name} - {item.chapter_name}"
 
-        # Determine header for this item
-        header = f"{header_text_prefix}{item['problem_set_name']} - {item['chapter_name']}"
+        img_h, spacer_h, total_block = _block_size(item, spacer_ratio, max_col_height)
 
-        # Calculate image dimensions scaled to column width
-        img_w = COLUMN_WIDTH
-        img_h = (item["height"] / item["width"]) * img_w if item["width"] > 0 else 40.0
-        spacer_h = img_h * spacer_ratio
+        # New chapter/problem_set -> new page
+        if not headers or headers[-1] != header:
+            _start_new_page(header)
 
-        total_block = PROBLEM_LABEL_HEIGHT + img_h + spacer_h
+        if not _fits(col, total_block):
+            if col == 0 and _fits(1, total_block):
+                col = 1
+            else:
+                _start_new_page(header)
+
+        placements.append(
+            Placement(
+                len(headers) - 1,
+                col,
+                _column_x(col),
+                y_pos[col],
+                COLUMN_WIDTH,
+                img_h,
+                spacer_h,
+            )
+        )
+        y_pos[col] += total_block
 
-        # If even a fresh column on a new page can't fit this block, cap spacer
-        max_col_height = USABLE_HEIGHT - HEADER_HEIGHT - 2.0
-        if total_block > max_col_height:
-            spacer_h = max(0, max_col_height - PROBLEM_LABEL_HEIGHT - img_h)
-            total_block = PROBLEM_LABEL_HEIGHT + img_h + spacer_h
+    return LayoutPlan(headers, placements)
 
-        # Check if we need a new page or column
-        if current_header != header or pdf.page == 0:
-            if pdf.page == 0:
-                _start_new_page(header)
-            elif current_header != header:
-                # New chapter/problem_set -> new page
-                _start_new_page(header)
-            current_header = header
 
-        if _available_height(col) < total_block:
-            if col == 0:
-                col = 1
-                if _available_height(col) < total_block:
-                    _start_new_page(header)
-                    current_header = header
+def _plan_compact(
+    items: list[LayoutItem],
+    spacer_ratio: float,
+    header_text_prefix: str,
+) -> LayoutPlan:
+    """Plan a page-minimizing layout with inline chapter headers.
+
+    Chapters (runs of items with the same problem set and chapter) share
+    pages. Each chapter goes whole into the first column, on any page
+    so far, with room for it (first-fit bin packing); a chapter that
+    fits nowhere flows on from the last column, repeating its header
+    when it continues in a new column. Problem order within a chapter is
+    kept. Finally a last page using only its left column is split evenly
+    across both columns.
+    """
+    top = MARGIN_TOP + HEADER_HEIGHT + 2.0
+    bottom = PAGE_H - MARGIN_BOTTOM
+    # A fresh column must hold a chapter header plus any single block
+    max_block = bottom - top - SECTION_HEADER_HEIGHT
+
+    # Columns in reading order (page = index // 2). Entries are
+    # ("section", text, height) or ("item", index, height).
+    columns: list[list[tuple]] = []
+    heights: list[float] = []
+
+    def _new_column() -> int:
+        columns.append([])
+        heights.append(0.0)
+        return len(columns) - 1
+
+    def _add(col: int, entry: tuple) -> None:
+        columns[col].append(entry)
+        heights[col] += entry[2]
+
+    sections: list[tuple[str, list[int]]] = []
+    for idx, item in enumerate(items):
+        title = f"{item.problem_set_name} - {item.chapter_name}"
+        if not sections or sections[-1][0] != title:
+            sections.append((title, []))
+        sections[-1][1].append(idx)
+
+    blocks = [_block_size(item, spacer_ratio, max_block) for item in items]
+
+    for title, indices in sections:
+        height = SECTION_HEADER_HEIGHT + sum(blocks[i][2] for i in indices)
+        col = next(
+            (c for c in range(len(columns)) if top + heights[c] + height <= bottom),
+            None,
+        )
+        if col is not None:
+            _add(col, ("section", title, SECTION_HEADER_HEIGHT))
+            for i in indices:
+                _add(col, ("item", i, blocks[i][2]))
+            continue
+
+        col = len(columns) - 1 if columns else _new_column()
+        pending = title
+        for i in indices:
+            need = blocks[i][2] + (SECTION_HEADER_HEIGHT if pending else 0)
+            if top + heights[col] + need > bottom:
+                col = _new_column()
+                pending = pending or f"{title} (계속)"
+            if pending:
+                _add(col, ("section", pending, SECTION_HEADER_HEIGHT))
+                pending = None
+            _add(col, ("item", i, blocks[i][2]))
+
+    if len(columns) % 2 == 1:
+        _balance_last_column(columns)
+
+    headers: list[str] = []
+    placements: list[Placement | None] = [None] * len(items)
+    section_headers: list[SectionHeader] = []
+    for col_idx, entries in enumerate(columns):
+        page, col = divmod(col_idx, 2)
+        if col == 0:
+            set_names = dict.fromkeys(
+                items[e[1]].problem_set_name
+                for c in columns[col_idx:col_idx + 2]
+                for e in c
+                if e[0] == "item"
+            )
+            headers.append(header_text_prefix + ", ".join(set_names))
+
+        x, y = _column_x(col), top
+        for entry in entries:
+            if entry[0] == "section":
+                section_headers.append(SectionHeader(page, x, y, entry[1]))
             else:
-                _start_new_page(header)
-                current_header = header
-
-        x = _col_x(col)
-        y = y_pos[col]
-
-        # Draw problem number label
-        pdf._set_font(PROBLEM_LABEL_FONT_SIZE, bold=False)
-        pdf.set_text_color(60, 60, 60)
-        pdf.set_xy(x, y)
-        pdf.cell(COLUMN_WIDTH, PROBLEM_LABEL_HEIGHT, f"{item['number']}번", align="L")
-        pdf.set_text_color(0, 0, 0)
-        y += PROBLEM_LABEL_HEIGHT
-
-        # Draw image
-        image_path = item["image_path"]
-        if Path(image_path).exists():
-            pdf.image(image_path, x=x, y=y, w=img_w)
+                img_h, spacer_h, _ = blocks[entry[1]]
+                placements[entry[1]] = Placement(
+                    page, col, x, y, COLUMN_WIDTH, img_h, spacer_h
+                )
+            y += entry[2]
+
+    return LayoutPlan(headers, placements, section_headers)
+
+
+def _balance_last_column(columns: list[list[tuple]]) -> None:
+    """Split a lone left column across both columns of its page.
+
+    The split falls before a chapter header or between two items, where
+    it minimizes the taller column; a chapter cut in two gets a
+    continuation header on the right.
+    """
+    entries = columns[-1]
+    total = sum(e[2] for e in entries)
+    best_height, best = total, None
+
+    left = 0.0
+    title = ""
+    for j, entry in enumerate(entries):
+        if j > 0 and entry[0] == "section":
+            split = (max(left, total - left), j, None)
+        elif j > 0 and entries[j - 1][0] != "section":
+            continued = ("section", f"{title} (계속)", SECTION_HEADER_HEIGHT)
+            split = (max(left, total - left + SECTION_HEADER_HEIGHT), j, continued)
         else:
-            # Draw placeholder rectangle
-            pdf.set_draw_color(200, 200, 200)
-            pdf.rect(x, y, img_w, img_h)
-            pdf._set_font(7)
-            pdf.set_xy(x, y + img_h / 2 - 3)
-            pdf.cell(img_w, 6, "Image not found", align="C")
-            pdf.set_draw_color(0, 0, 0)
-            logger.warning("Image not found: %s", image_path)
-
-        y += img_h + spacer_h
-        y_pos[col] = y
+            split = None
+        if split is not None and split[0] < best_height:
+            best_height, best = split[0], split[1:]
+
+        if entry[0] == "section":
+            title = entry[1].removesuffix(" (계속)")
+        left += entry[2]
+
+    if best is None:
+        return
+    j, continued = best
+    columns[-1] = entries[:j]
+    columns.append(([continued] if continued else []) + entries[j:])
+
+
+def _draw_header(pdf: _WrongAnswerPDF, header: str) -> None:
+    pdf._set_font(HEADER_FONT_SIZE, bold=True)
+    pdf.set_xy(MARGIN_LEFT, MARGIN_TOP)
+    pdf.set_text_color(80, 80, 80)
+    pdf.cell(
+        PAGE_W - MARGIN_LEFT - MARGIN_RIGHT,
+        HEADER_HEIGHT,
+        header,
+        border="B",
+        align="L",
+    )
+    pdf.set_text_color(0, 0, 0)
+
+
+def _render_layout(
+    pdf: _WrongAnswerPDF, items: list[LayoutItem], plan: LayoutPlan
+) -> None:
+    """Draw planned pages: headers, labels and images (or placeholders)."""
+    # A packed plan may place a later chapter on an earlier page
+    on_page: list[list[tuple[LayoutItem, Placement]]] = [[] for _ in plan.headers]
+    for item, placement in zip(items, plan.placements):
+        on_page[placement.page].append((item, placement))
+    sections: list[list[SectionHeader]] = [[] for _ in plan.headers]
+    for section in plan.sections:
+        sections[section.page].append(section)
+
+    for page, header in enumerate(plan.headers):
+        pdf.add_page()
+        _draw_header(pdf, header)
+        for section in sections[page]:
+            _draw_section_header(pdf, section)
+        for item, placement in on_page[page]:
+            _draw_item(pdf, item, placement)
+
+
+def _draw_section_header(pdf: _WrongAnswerPDF, section: SectionHeader) -> None:
+    pdf._set_font(SECTION_HEADER_FONT_SIZE, bold=True)
+    pdf.set_text_color(80, 80, 80)
+    pdf.set_xy(section.x, section.y)
+    pdf.cell(
+        COLUMN_WIDTH, SECTION_HEADER_HEIGHT - 1.0, section.text, border="B", align="L"
+    )
+    pdf.set_text_color(0, 0, 0)
 
-    for item in items:
-        _place_item(item)
+
+def _draw_item(pdf: _WrongAnswerPDF, item: LayoutItem, placement: Placement) -> None:
+    x, y = placement.x, placement.y
+    img_w, img_h = placement.w, placement.h
+
+    # Draw problem number label
+    pdf._set_font(PROBLEM_LABEL_FONT_SIZE, bold=False)
+    pdf.set_text_color(60, 60, 60)
+    pdf.set_xy(x, y)
+    pdf.cell(COLUMN_WIDTH, PROBLEM_LABEL_HEIGHT, f"{item.number}번", align="L")
+    pdf.set_text_color(0, 0, 0)
+    y += PROBLEM_LABEL_HEIGHT
+
+    # Draw image
+    image_path = item.image_path
+    if item.image_exists:
+        pdf._place_image(image_path, x=x, y=y, w=img_w)
+    else:
+        # Draw placeholder rectangle
+        pdf.set_draw_color(200, 200, 200)
+        pdf.rect(x, y, img_w, img_h)
+        pdf._set_font(7)
+        pdf.set_xy(x, y + img_h / 2 - 3)
+        pdf.cell(img_w, 6, "Image not found", align="C")
+        pdf.set_draw_color(0, 0, 0)
+        logger.warning("Image not found: %s", image_path)
+
+
+def _plan_student(data: dict, spacer_ratio: float, layout: str = "standard") -> LayoutPlan:
+    """Plan one student's pages; layout is "standard" or "compact"."""
+    prefix = f"{data['student_name']} | " if data["student_name"] else ""
+    planner = _plan_compact if layout == "compact" else _plan_layout
+    return planner(data["items"], spacer_ratio, prefix)
 
 
 def _add_divider_page(pdf: _WrongAnswerPDF, student_name: str) -> None:
@@ -324,16 +780,237 @@ def _add_divider_page(pdf: _WrongAnswerPDF, student_name: str) -> None:
     pdf.set_text_color(0, 0, 0)
 
 
+def _render_student(
+    pdf: _WrongAnswerPDF,
+    data: dict,
+    spacer_ratio: float,
+    include_dividers: bool,
+    layout: str = "standard",
+) -> None:
+    """Append one student's divider page and problems to a batch PDF."""
+    if include_dividers:
+        _add_divider_page(pdf, data["student_name"])
+
+    _render_layout(pdf, data["items"], _plan_student(data, spacer_ratio, layout))
+
+    if not data["items"]:
+        pdf.add_page()
+        pdf._set_font(12)
+        pdf.set_xy(MARGIN_LEFT, PAGE_H / 2 - 5)
+        pdf.cell(
+            PAGE_W - MARGIN_LEFT - MARGIN_RIGHT,
+            10,
+            f"{data['student_name']} - 등록된 오답이 없습니다.",
+            align="C",
+        )
+
+
+def _render_shard(
+    shard_data: list[dict],
+    spacer_ratio: float,
+    include_dividers: bool,
+    layout: str,
+    shard_path: str,
+) -> dict:
+    """Render consecutive students to their own PDF. Runs on the process pool."""
+    pdf = _WrongAnswerPDF()
+    for data in shard_data:
+        _render_student(pdf, data, spacer_ratio, include_dividers, layout)
+    pdf.output(shard_path)
+    return pdf._dedup_stats()
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=PDF_WORKERS, initializer=warm_up
+        )
+    return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+def _render_batch_parallel(
+    set_data: list[dict],
+    spacer_ratio: float,
+    include_dividers: bool,
+    layout: str,
+    progress: ProgressCallback | None = None,
+    cancel_event: threading.Event | None = None,
+) -> tuple[bytes, dict]:
+    """Render students as shard PDFs on the pool and concatenate them in order.
+
+    Each shard is a run of consecutive students (about two per worker) so
+    the per-document font setup is not paid once per student. Shards
+    embed their own copy of shared fonts and images; saving with
+    garbage=4 merges those duplicate objects again.
+    """
+    pool = _get_process_pool()
+    shard_size = -(-len(set_data) // (PDF_WORKERS * 2))
+    shards = [
+        set_data[start:start + shard_size]
+        for start in range(0, len(set_data), shard_size)
+    ]
+
+    with tempfile.TemporaryDirectory(dir=PDF_OUTPUT_DIR) as shard_dir:
+        shard_paths = [
+            str(Path(shard_dir) / f"{idx:04d}.pdf") for idx in range(len(shards))
+        ]
+        futures = {
+            pool.submit(
+                _render_shard, shard, spacer_ratio, include_dividers, layout, path
+            ): shard
+            for shard, path in zip(shards, shard_paths)
+        }
+        shard_stats = []
+        students_done = 0
+        try:
+            for future in as_completed(futures):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise GenerationCancelled()
+                shard_stats.append(future.result())
+                students_done += len(futures[future])
+                if progress is not None:
+                    progress(students_done, len(set_data))
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+        merged = fitz.open()
+        try:
+            for path in shard_paths:
+                with fitz.open(path) as shard:
+                    merged.insert_pdf(shard)
+            content = merged.tobytes(garbage=4, deflate=True)
+        finally:
+            merged.close()
+
+    return content, {
+        "unique_images": sum(s["unique_images"] for s in shard_stats),
+        "placements": sum(s["placements"] for s in shard_stats),
+        "saved_bytes": sum(s["saved_bytes"] for s in shard_stats),
+    }
+
+
+def _render_single(
+    data: dict, spacer_ratio: float, layout: str = "standard"
+) -> tuple[bytes, dict]:
+    pdf = _WrongAnswerPDF()
+
+    _render_layout(pdf, data["items"], _plan_student(data, spacer_ratio, layout))
+
+    if not data["items"]:
+        pdf.add_page()
+        pdf._set_font(12)
+        pdf.set_xy(MARGIN_LEFT, PAGE_H / 2 - 5)
+        pdf.cell(
+            PAGE_W - MARGIN_LEFT - MARGIN_RIGHT,
+            10,
+            "등록된 오답이 없습니다.",
+            align="C",
+        )
+
+    return bytes(pdf.output()), pdf._dedup_stats()
+
+
+def _render_batch(
+    set_data: list[dict],
+    spacer_ratio: float,
+    include_dividers: bool,
+    layout: str,
+    parallel: bool,
+    progress: ProgressCallback | None = None,
+    cancel_event: threading.Event | None = None,
+) -> tuple[bytes, dict]:
+    if parallel and PDF_WORKERS > 1 and len(set_data) > 1:
+        return _render_batch_parallel(
+            set_data, spacer_ratio, include_dividers, layout, progress, cancel_event
+        )
+
+    pdf = _WrongAnswerPDF()
+    for idx, data in enumerate(set_data):
+        if cancel_event is not None and cancel_event.is_set():
+            raise GenerationCancelled()
+        _render_student(pdf, data, spacer_ratio, include_dividers, layout)
+        if progress is not None:
+            progress(idx + 1, len(set_data))
+    return bytes(pdf.output()), pdf._dedup_stats()
+
+
+def _write_output(content: bytes, filename: str) -> None:
+    """Write via a temp file so a concurrent cache hit never sees a partial PDF."""
+    output_path = PDF_OUTPUT_DIR / filename
+    tmp_path = output_path.with_name(
+        f".{output_path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    )
+    tmp_path.write_bytes(content)
+    os.replace(tmp_path, output_path)
+
+
+def _layout_options(layout: str) -> dict:
+    # Standard layouts keep the cache keys they had before layouts existed
+    return {} if layout == "standard" else {"layout": layout}
+
+
+def _print_options(print_profile: str) -> dict:
+    # Keys are computed from the stored image paths, before print copies
+    # are resolved, so they name the copies by profile and width instead
+    return {"print_profile": print_profile, "print_width": PRINT_WIDTH_PX}
+
+
+def _single_filename(
+    wrong_answer_set_id: int,
+    data: dict,
+    spacer_ratio: float,
+    layout: str,
+    print_profile: str,
+) -> str:
+    key = pdf_cache.cache_key(
+        [data],
+        spacer_ratio=spacer_ratio,
+        **_layout_options(layout),
+        **_print_options(print_profile),
+    )
+    return f"wrong_answers_{wrong_answer_set_id}_{key}.pdf"
+
+
+def _batch_filename(
+    set_data: list[dict],
+    spacer_ratio: float,
+    include_dividers: bool,
+    layout: str,
+    print_profile: str,
+) -> str:
+    key = pdf_cache.cache_key(
+        set_data,
+        spacer_ratio=spacer_ratio,
+        include_dividers=include_dividers,
+        **_layout_options(layout),
+        **_print_options(print_profile),
+    )
+    return f"batch_{key}.pdf"
+
+
 # ---------------------------------------------------------------------------
 # Public API
 # ---------------------------------------------------------------------------
 def generate_wrong_answer_pdf(
     wrong_answer_set_id: int,
     spacer_ratio: float = 1.0,
+    print_profile: str = "color",
+    layout: str = "standard",
 ) -> str:
     """Generate PDF for a single student's wrong answer set.
 
-    Returns the output filename (relative to PDF_OUTPUT_DIR).
+    Returns the output filename (relative to PDF_OUTPUT_DIR). A file
+    already rendered from identical inputs is reused.
 
     Algorithm:
     1. Fetch wrong answer entries from DB (chapters + problem numbers)
@@ -348,31 +1025,32 @@ def generate_wrong_answer_pdf(
 
     spacer_ratio: multiply problem image height by this to get spacer height
     (1.0 = same space as problem, 0.5 = half, 2.0 = double)
-    """
-    data = _fetch_set_data(wrong_answer_set_id)
 
-    pdf = _WrongAnswerPDF()
+    print_profile: "color", "grayscale" or "mono" (1-bit); converted
+    images are cached per problem image, see get_print_image.
 
-    prefix = f"{data['student_name']} | " if data["student_name"] else ""
-    _layout_items(pdf, data["items"], spacer_ratio, prefix)
+    layout: "standard" starts a page per chapter as above; "compact"
+    packs chapters onto shared pages (see _plan_compact).
+    """
+    data = _fetch_sets_data([wrong_answer_set_id])[0]
 
-    if not data["items"]:
-        pdf.add_page()
-        pdf._set_font(12)
-        pdf.set_xy(MARGIN_LEFT, PAGE_H / 2 - 5)
-        pdf.cell(
-            PAGE_W - MARGIN_LEFT - MARGIN_RIGHT,
-            10,
-            "등록된 오답이 없습니다.",
-            align="C",
-        )
+    filename = _single_filename(
+        wrong_answer_set_id, data, spacer_ratio, layout, print_profile
+    )
+    if pdf_cache.lookup(filename):
+        return filename
 
-    filename = f"wrong_answers_{wrong_answer_set_id}_{uuid.uuid4().hex[:8]}.pdf"
-    output_path = PDF_OUTPUT_DIR / filename
-    pdf.output(str(output_path))
+    data = _resolve_print_images([data], print_profile)[0]
+    content, stats = _render_single(data, spacer_ratio, layout)
+    _write_output(content, filename)
+    pdf_cache.store(filename, [wrong_answer_set_id])
 
     logger.info(
-        "Generated PDF: %s (%d items)", filename, len(data["items"])
+        "Generated PDF: %s (%d items, %d unique images, %d bytes saved by reuse)",
+        filename,
+        len(data["items"]),
+        stats["unique_images"],
+        stats["saved_bytes"],
     )
     return filename
 
@@ -381,44 +1059,205 @@ def generate_batch_pdf(
     wrong_answer_set_ids: list[int],
     spacer_ratio: float = 1.0,
     include_dividers: bool = True,
+    parallel: bool = True,
+    progress: ProgressCallback | None = None,
+    cancel_event: threading.Event | None = None,
+    print_profile: str = "color",
+    layout: str = "standard",
 ) -> str:
     """Generate a single PDF with multiple students' wrong answers.
 
     If include_dividers is True, add a divider page between students
     with the student's name centered on the page.
 
-    Returns the output filename.
+    If parallel is True, students are laid out on a process pool into
+    shard PDFs that are concatenated in order; pages match the serial
+    path.
+
+    progress is called as students finish; setting cancel_event stops
+    the render with GenerationCancelled before the file is written.
+
+    print_profile and layout are as for generate_wrong_answer_pdf.
+
+    Returns the output filename. A file already rendered from identical
+    inputs is reused.
     """
     if not wrong_answer_set_ids:
         raise ValueError("At least one wrong answer set ID is required")
 
-    pdf = _WrongAnswerPDF()
+    set_data = _fetch_sets_data(wrong_answer_set_ids)
 
-    for idx, set_id in enumerate(wrong_answer_set_ids):
-        data = _fetch_set_data(set_id)
+    filename = _batch_filename(
+        set_data, spacer_ratio, include_dividers, layout, print_profile
+    )
+    if pdf_cache.lookup(filename):
+        if progress is not None:
+            progress(len(set_data), len(set_data))
+        return filename
+
+    set_data = _resolve_print_images(set_data, print_profile)
+    content, stats = _render_batch(
+        set_data,
+        spacer_ratio,
+        include_dividers,
+        layout,
+        parallel,
+        progress,
+        cancel_event,
+    )
+    _write_output(content, filename)
+    pdf_cache.store(filename, wrong_answer_set_ids, batch=True)
 
-        if include_dividers:
-            _add_divider_page(pdf, data["student_name"])
+    logger.info(
+        "Generated batch PDF: %s (%d students, %d placements of %d unique images, "
+        "%d bytes saved by reuse)",
+        filename,
+        len(wrong_answer_set_ids),
+        stats["placements"],
+        stats["unique_images"],
+        stats["saved_bytes"],
+    )
+    return filename
 
-        prefix = f"{data['student_name']} | " if data["student_name"] else ""
-        _layout_items(pdf, data["items"], spacer_ratio, prefix)
 
-        if not data["items"]:
-            pdf.add_page()
-            pdf._set_font(12)
-            pdf.set_xy(MARGIN_LEFT, PAGE_H / 2 - 5)
-            pdf.cell(
-                PAGE_W - MARGIN_LEFT - MARGIN_RIGHT,
-                10,
-                f"{data['student_name']} - 등록된 오답이 없습니다.",
-                align="C",
-            )
+def render_wrong_answer_pdf(
+    wrong_answer_set_id: int,
+    spacer_ratio: float = 1.0,
+    print_profile: str = "color",
+    layout: str = "standard",
+) -> tuple[str, bytes]:
+    """Render a single set without writing it to PDF_OUTPUT_DIR.
 
-    filename = f"batch_{uuid.uuid4().hex[:8]}.pdf"
-    output_path = PDF_OUTPUT_DIR / filename
-    pdf.output(str(output_path))
+    Returns (filename, content). An already cached file is read back
+    instead of rendering again.
+    """
+    data = _fetch_sets_data([wrong_answer_set_id])[0]
 
-    logger.info(
-        "Generated batch PDF: %s (%d students)", filename, len(wrong_answer_set_ids)
+    filename = _single_filename(
+        wrong_answer_set_id, data, spacer_ratio, layout, print_profile
     )
-    return filename
+    if pdf_cache.lookup(filename):
+        return filename, (PDF_OUTPUT_DIR / filename).read_bytes()
+
+    data = _resolve_print_images([data], print_profile)[0]
+    content, _ = _render_single(data, spacer_ratio, layout)
+    return filename, content
+
+
+def render_batch_pdf(
+    wrong_answer_set_ids: list[int],
+    spacer_ratio: float = 1.0,
+    include_dividers: bool = True,
+    parallel: bool = True,
+    print_profile: str = "color",
+    layout: str = "standard",
+) -> tuple[str, bytes]:
+    """Render a batch without writing it to PDF_OUTPUT_DIR.
+
+    Returns (filename, content). An already cached file is read back
+    instead of rendering again.
+    """
+    if not wrong_answer_set_ids:
+        raise ValueError("At least one wrong answer set ID is required")
+
+    set_data = _fetch_sets_data(wrong_answer_set_ids)
+
+    filename = _batch_filename(
+        set_data, spacer_ratio, include_dividers, layout, print_profile
+    )
+    if pdf_cache.lookup(filename):
+        return filename, (PDF_OUTPUT_DIR / filename).read_bytes()
+
+    set_data = _resolve_print_images(set_data, print_profile)
+    content, _ = _render_batch(
+        set_data, spacer_ratio, include_dividers, layout, parallel
+    )
+    return filename, content
+
+
+def plan_pdf(
+    wrong_answer_set_ids: list[int],
+    spacer_ratios: list[float],
+    include_dividers: bool = True,
+    include_placements: bool = False,
+    layout: str = "standard",
+) -> list[dict]:
+    """Lay out the given sets for each spacer ratio without rendering.
+
+    Uses only the stored image sizes: no image is opened and no file is
+    written. Page numbers are 1-based within the document that
+    generate_batch_pdf (or, without dividers, generate_wrong_answer_pdf
+    for a single set) would produce.
+
+    Returns one entry per ratio:
+        {"spacer_ratio", "total_pages", "pages_saved", "students": [{
+            "wrong_answer_set_id", "student_name", "first_page", "pages",
+            "pages_saved",
+            "placements": [{"chapter_id", "number", "page", "column",
+                            "x", "y", "w", "h", "spacer"}],  # if requested
+            "sections": [{"page", "x", "y", "text"}],        # if requested
+        }]}
+    pages_saved compares a compact layout with the standard one (0 for
+    the standard layout itself).
+    """
+    if not wrong_answer_set_ids:
+        raise ValueError("At least one wrong answer set ID is required")
+
+    set_data = _fetch_sets_data(wrong_answer_set_ids)
+    dividers = int(include_dividers)
+
+    plans = []
+    for spacer_ratio in spacer_ratios:
+        students = []
+        next_page = 1
+        for set_id, data in zip(wrong_answer_set_ids, set_data):
+            plan = _plan_student(data, spacer_ratio, layout)
+            first_page = next_page + dividers
+            # A set without items still gets its "no wrong answers" page
+            pages = dividers + max(len(plan.headers), 1)
+            if layout == "standard":
+                standard_pages = pages
+            else:
+                standard_plan = _plan_student(data, spacer_ratio)
+                standard_pages = dividers + max(len(standard_plan.headers), 1)
+            student = {
+                "wrong_answer_set_id": set_id,
+                "student_name": data["student_name"],
+                "first_page": next_page,
+                "pages": pages,
+                "pages_saved": standard_pages - pages,
+            }
+            if include_placements:
+                student["placements"] = [
+                    {
+                        "chapter_id": item.chapter_id,
+                        "number": item.number,
+                        "page": first_page + p.page,
+                        "column": p.column,
+                        "x": round(p.x, 2),
+                        "y": round(p.y, 2),
+                        "w": round(p.w, 2),
+                        "h": round(p.h, 2),
+                        "spacer": round(p.spacer, 2),
+                    }
+                    for item, p in zip(data["items"], plan.placements)
+                ]
+                student["sections"] = [
+                    {
+                        "page": first_page + section.page,
+                        "x": round(section.x, 2),
+                        "y": round(section.y, 2),
+                        "text": section.text,
+                    }
+                    for section in plan.sections
+                ]
+            students.append(student)
+            next_page += pages
+
+        plans.append({
+            "spacer_ratio": spacer_ratio,
+            "total_pages": next_page - 1,
+            "pages_saved": sum(student["pages_saved"] for student in students),
+            "students": students,
+        })
+    return plans
@@ -0,0 +1,36 @@
+import hashlib
+from pathlib import Path
+
+_CHUNK_SIZE = 1 << 20
+
+
+def file_fingerprint(path: Path) -> dict:
+    """Return size, mtime and SHA-256 of a file."""
+    stat = path.stat()
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_CHUNK_SIZE):
+            digest.update(chunk)
+    return {
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "hash": digest.hexdigest(),
+    }
+
+
+def is_unchanged(path: Path, stored: dict) -> tuple[bool, dict | None]:
+    """Compare a file against a stored fingerprint (size, mtime, hash).
+
+    Size and mtime matching is trusted without hashing. Otherwise the
+    content hash decides, so a touched but identical file is unchanged.
+    Returns (unchanged, fresh fingerprint or None if not computed).
+    """
+    if stored.get("hash") is None:
+        return False, file_fingerprint(path)
+
+    stat = path.stat()
+    if stat.st_size == stored["size"] and stat.st_mtime == stored["mtime"]:
+        return True, None
+
+    fingerprint = file_fingerprint(path)
+    return fingerprint["hash"] == stored["hash"], fingerprint
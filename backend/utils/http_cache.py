@@ -0,0 +1,69 @@
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+
+# For URLs whose content can never change (content-hashed names)
+IMMUTABLE = "max-age=31536000, immutable"
+# Cache, but revalidate with the ETag on every use
+REVALIDATE = "no-cache"
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match uses weak comparison, so W/ prefixes are ignored."""
+    if header.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in header.split(","))
+    return etag.removeprefix("W/") in (tag.removeprefix("W/") for tag in tags)
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= since
+    return False
+
+
+def cached_file_response(
+    request: Request,
+    path: Path,
+    *,
+    etag: str | None = None,
+    cache_control: str = REVALIDATE,
+    media_type: str | None = None,
+    filename: str | None = None,
+) -> Response:
+    """FileResponse with ETag/Last-Modified/Cache-Control and 304 handling.
+
+    ``etag`` is the unquoted strong validator; it defaults to one derived
+    from the file's mtime and size.
+    """
+    stat = path.stat()
+    if etag is None:
+        etag = f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+    etag = f'"{etag}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": cache_control,
+    }
+
+    if _not_modified(request, etag, stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    return FileResponse(
+        path,
+        headers=headers,
+        media_type=media_type,
+        filename=filename,
+        stat_result=stat,
+    )
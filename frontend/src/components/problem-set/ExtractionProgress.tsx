@@ -1,6 +1,6 @@
 interface ExtractionProgressProps {
   status: 'idle' | 'extracting' | 'done' | 'error' | 'cancelled'
-  currentChapter: string
+  lastCompletedChapter: string
   chaptersCompleted: number
   totalChapters: number
   totalProblems: number
@@ -12,7 +12,7 @@ interface ExtractionProgressProps {
 
 export function ExtractionProgress({
   status,
-  currentChapter,
+  lastCompletedChapter,
   chaptersCompleted,
   totalChapters,
   totalProblems,
@@ -50,7 +50,7 @@ export function ExtractionProgress({
           </div>
           <div className="flex justify-between text-xs text-gray-500">
             <span>
-              {currentChapter && `현재: ${currentChapter}`}
+              {lastCompletedChapter && `완료: ${lastCompletedChapter}`}
             </span>
             <span>
               {chaptersCompleted}/{totalChapters} 단원 ({totalProblems}문제)
@@ -5,7 +5,7 @@ import { NumberEditor } from "./NumberEditor";
 interface ImageCardProps {
   id: number;
   number: number;
-  imagePath: string;
+  imageUrl: string;
   onNumberChange: (newNumber: number) => void;
   onDelete: () => void;
 }
@@ -13,7 +13,7 @@ interface ImageCardProps {
 export function ImageCard({
   id,
   number,
-  imagePath,
+  imageUrl,
   onNumberChange,
   onDelete,
 }: ImageCardProps) {
@@ -61,7 +61,9 @@ export function ImageCard({
 
       <div className="relative">
         <img
-          src={`/images/${imagePath}`}
+          src={`${imageUrl}?size=thumb`}
+          srcSet={`${imageUrl}?size=thumb 400w, ${imageUrl}?size=medium 1000w`}
+          sizes="(min-width: 1024px) 33vw, (min-width: 640px) 50vw, 100vw"
           alt={`문제 ${number}`}
           loading="lazy"
           className="w-full h-auto object-contain bg-gray-50"
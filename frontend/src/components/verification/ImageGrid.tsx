@@ -19,6 +19,7 @@ interface Problem {
   id: number
   number: number
   image_path: string
+  image_url: string
 }
 
 interface ImageGridProps {
@@ -74,7 +75,7 @@ export function ImageGrid({ problems, onReorder, onNumberChange, onDelete }: Ima
               key={problem.id}
               id={problem.id}
               number={problem.number}
-              imagePath={problem.image_path}
+              imageUrl={problem.image_url}
               onNumberChange={(n) => onNumberChange(problem.id, n)}
               onDelete={() => {
                 if (window.confirm(`문제 #${problem.number}을 삭제하시겠습니까?`)) {
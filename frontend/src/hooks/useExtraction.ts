@@ -1,7 +1,7 @@
 import { useState, useCallback, useRef } from 'react'
 
 interface ExtractionProgress {
-  type: 'chapter_start' | 'problem' | 'chapter_done' | 'done' | 'error' | 'cancelled'
+  type: 'chapter_queued' | 'problem' | 'chapter_done' | 'done' | 'error' | 'cancelled'
   chapter?: string
   total_chapters?: number
   total_so_far?: number
@@ -15,7 +15,7 @@ interface ExtractionState {
   status: ExtractionStatus
   jobId: string | null
   problemSetId: number | null
-  currentChapter: string
+  lastCompletedChapter: string
   chaptersCompleted: number
   totalChapters: number
   totalProblems: number
@@ -26,7 +26,7 @@ const initialState: ExtractionState = {
   status: 'idle',
   jobId: null,
   problemSetId: null,
-  currentChapter: '',
+  lastCompletedChapter: '',
   chaptersCompleted: 0,
   totalChapters: 0,
   totalProblems: 0,
@@ -74,10 +74,9 @@ export function useExtraction() {
 
         setState(prev => {
           switch (progress.type) {
-            case 'chapter_start':
+            case 'chapter_queued':
               return {
                 ...prev,
-                currentChapter: progress.chapter ?? '',
                 totalChapters: progress.total_chapters ?? prev.totalChapters,
               }
             case 'problem':
@@ -88,6 +87,7 @@ export function useExtraction() {
             case 'chapter_done':
               return {
                 ...prev,
+                lastCompletedChapter: progress.chapter ?? prev.lastCompletedChapter,
                 chaptersCompleted: prev.chaptersCompleted + 1,
               }
             case 'done':
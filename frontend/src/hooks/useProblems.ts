@@ -5,6 +5,7 @@ interface Problem {
   id: number;
   number: number;
   image_path: string;
+  image_url: string;
   width: number;
   height: number;
   file_size: number;
@@ -31,6 +31,7 @@ interface RecentSet {
 interface PdfResponse {
   filename: string
   download_url: string
+  pages_saved: number | null
 }
 
 interface StudentSelection {
@@ -46,6 +47,8 @@ export default function BatchPrintPage() {
   const [selections, setSelections] = useState<StudentSelection[]>([])
   const [spacerRatio, setSpacerRatio] = useState(1.0)
   const [includeDividers, setIncludeDividers] = useState(true)
+  const [printProfile, setPrintProfile] = useState<'color' | 'grayscale' | 'mono'>('color')
+  const [compactLayout, setCompactLayout] = useState(false)
   const [generating, setGenerating] = useState(false)
   const [result, setResult] = useState<PdfResponse | null>(null)
   const [error, setError] = useState<string | null>(null)
@@ -201,6 +204,8 @@ export default function BatchPrintPage() {
         const data = await api.post<PdfResponse>('/pdf/generate', {
           wrong_answer_set_id: allSetIds[0],
           spacer_ratio: spacerRatio,
+          print_profile: printProfile,
+          layout: compactLayout ? 'compact' : 'standard',
         })
         setResult(data)
       } else {
@@ -208,6 +213,8 @@ export default function BatchPrintPage() {
           wrong_answer_set_ids: allSetIds,
           spacer_ratio: spacerRatio,
           include_dividers: includeDividers,
+          print_profile: printProfile,
+          layout: compactLayout ? 'compact' : 'standard',
         })
         setResult(data)
       }
@@ -445,6 +452,54 @@ export default function BatchPrintPage() {
                   </div>
                 </div>
 
+                {/* Print profile */}
+                <div>
+                  <label className="mb-1 block text-sm font-medium text-slate-700">
+                    인쇄 색상
+                  </label>
+                  <p className="mb-2 text-xs text-slate-400">
+                    흑백(1비트)은 파일이 훨씬 작아 인쇄 서버 전송이 빠릅니다.
+                  </p>
+                  <select
+                    data-testid="print-profile-select"
+                    value={printProfile}
+                    onChange={(e) => setPrintProfile(e.target.value as typeof printProfile)}
+                    className="w-full rounded-md border border-slate-300 px-3 py-2 text-sm"
+                  >
+                    <option value="color">컬러</option>
+                    <option value="grayscale">회색조</option>
+                    <option value="mono">흑백 (1비트)</option>
+                  </select>
+                </div>
+
+                {/* Compact layout toggle */}
+                <div className="flex items-center justify-between">
+                  <div>
+                    <label className="text-sm font-medium text-slate-700">
+                      페이지 절약 배치
+                    </label>
+                    <p className="text-xs text-slate-400">
+                      여러 단원을 한 페이지에 이어 배치합니다.
+                    </p>
+                  </div>
+                  <button
+                    data-testid="compact-layout-toggle"
+                    type="button"
+                    role="switch"
+                    aria-checked={compactLayout}
+                    onClick={() => setCompactLayout((prev) => !prev)}
+                    className={`relative inline-flex h-6 w-11 shrink-0 cursor-pointer rounded-full border-2 border-transparent transition-colors focus:outline-none focus:ring-2 focus:ring-blue-500 focus:ring-offset-2 ${
+                      compactLayout ? 'bg-blue-600' : 'bg-slate-200'
+                    }`}
+                  >
+                    <span
+                      className={`pointer-events-none inline-block h-5 w-5 rounded-full bg-white shadow ring-0 transition-transform ${
+                        compactLayout ? 'translate-x-5' : 'translate-x-0'
+                      }`}
+                    />
+                  </button>
+                </div>
+
                 {/* Include dividers toggle */}
                 <div className="flex items-center justify-between">
                   <div>
@@ -508,7 +563,10 @@ export default function BatchPrintPage() {
                   <h4 className="mb-2 text-sm font-semibold text-green-800">
                     PDF 생성 완료
                   </h4>
-                  <p className="mb-3 text-xs text-green-700">{result.filename}</p>
+                  <p className="mb-3 text-xs text-green-700">
+                    {result.filename}
+                    {result.pages_saved ? ` (기본 배치보다 ${result.pages_saved}쪽 절약)` : ''}
+                  </p>
                   <div className="flex flex-col gap-2">
                     <a
                       data-testid="pdf-download-link"
@@ -18,7 +18,7 @@ export default function ImportPage() {
           />
           <ExtractionProgress
             status={extraction.status}
-            currentChapter={extraction.currentChapter}
+            lastCompletedChapter={extraction.lastCompletedChapter}
             chaptersCompleted={extraction.chaptersCompleted}
             totalChapters={extraction.totalChapters}
             totalProblems={extraction.totalProblems}
@@ -22,9 +22,11 @@ interface ProblemSetDetail {
 
 interface RepairResult {
   chapter_id: number
+  mode: 'missing' | 'full'
   deleted_records: number
   extracted_count: number
   image_files: number
+  repaired_numbers?: number[]
 }
 
 interface HealthResult {
@@ -84,7 +86,9 @@ export default function VerificationPage() {
         fetchProblems()
       }
       setRepairMessage(
-        `복구 완료: ${result.extracted_count}개 문제 재추출 (기존 ${result.deleted_records}건 삭제)`
+        result.mode === 'missing'
+          ? `복구 완료: 누락된 ${result.extracted_count}개 문제만 재추출`
+          : `복구 완료: ${result.extracted_count}개 문제 재추출 (기존 ${result.deleted_records}건 삭제)`
       )
     } catch (err) {
       const message = err instanceof Error ? err.message : '복구 실패'
@@ -98,7 +102,7 @@ export default function VerificationPage() {
     setVerifying(true)
     setRepairMessage(null)
     try {
-      const health = await api.get<HealthResult>(`/problem-sets/${problemSetId}/health`)
+      const health = await api.get<HealthResult>(`/problem-sets/${problemSetId}/health?refresh=true`)
       if (health.all_healthy) {
         setRepairMessage('전체 검증 완료: 모든 단원이 정상입니다.')
       } else {
@@ -23,6 +23,7 @@ export interface Problem {
   chapter_id: number
   number: number
   image_path: string
+  image_url: string
   width: number
   height: number
   file_size: number
@@ -1,3 +1,4 @@
+import asyncio
 import webbrowser
 from pathlib import Path
 
@@ -6,8 +7,11 @@ from fastapi import FastAPI, Request
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 
-from backend.config import IMAGES_DIR
-from backend.database import init_db
+from backend.config import INTEGRITY_SWEEP_SECONDS
+from backend.database import close_pool, init_db, pool_stats
+from backend.services import pdf_generator
+from backend.services.image_store import collect_garbage
+from backend.services.integrity import run_integrity_sweeps
 from backend.routers import (
     extraction,
     problem_sets,
@@ -17,16 +21,45 @@ from backend.routers import (
     wrong_answers,
     pdf_generate,
     creation_history,
+    images,
 )
 
 app = FastAPI(title="Wrong Answer Builder", version="0.1.0")
 
 FRONTEND_DIST = Path(__file__).resolve().parent / "frontend" / "dist"
 
+_integrity_sweep: asyncio.Task | None = None
+
 
 @app.on_event("startup")
 def on_startup() -> None:
     init_db()
+    collect_garbage()
+
+
+@app.on_event("startup")
+async def start_integrity_sweep() -> None:
+    global _integrity_sweep
+    if INTEGRITY_SWEEP_SECONDS > 0:
+        _integrity_sweep = asyncio.get_running_loop().create_task(
+            run_integrity_sweeps(INTEGRITY_SWEEP_SECONDS)
+        )
+
+
+@app.on_event("startup")
+async def warm_pdf_caches() -> None:
+    # Parse the Korean font off the event loop so startup is not delayed
+    asyncio.get_running_loop().run_in_executor(None, pdf_generator.warm_up)
+
+
+@app.on_event("shutdown")
+def on_shutdown() -> None:
+    if _integrity_sweep is not None:
+        _integrity_sweep.cancel()
+    extraction.shutdown_process_pool()
+    pdf_generate.shutdown_job_pool()
+    pdf_generator.shutdown_process_pool()
+    close_pool()
 
 
 # ---------------------------------------------------------------------------
@@ -41,15 +74,19 @@ app.include_router(students.router)
 app.include_router(wrong_answers.router)
 app.include_router(pdf_generate.router)
 app.include_router(creation_history.router)
+app.include_router(images.router)
+
+
+@app.get("/api/db/pool")
+def db_pool_stats() -> dict:
+    """Connection pool counters, including time spent waiting for a connection."""
+    return pool_stats()
 
 
 # ---------------------------------------------------------------------------
 # Static file mounts
 # ---------------------------------------------------------------------------
 
-app.mount("/api/images", StaticFiles(directory=str(IMAGES_DIR)), name="api_images")
-app.mount("/images", StaticFiles(directory=str(IMAGES_DIR)), name="images")
-
 if FRONTEND_DIST.exists():
     app.mount(
         "/assets",
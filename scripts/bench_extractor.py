@@ -0,0 +1,87 @@
+"""Benchmark ways of scanning pages for problem images.
+
+Usage: python -m scripts.bench_extractor [pdf_dir]
+
+Each scanner runs in a fresh process over every PDF in ``pdf_dir``
+(default: samples/) and reports time per page and the process's peak
+RSS. The extractor needs each image's bbox and bytes; "get_image_info"
+only finds bboxes and is listed as a lower bound, since its entries
+cannot be tied to an xref without hashing every image (xrefs=True).
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import resource
+import sys
+import time
+from pathlib import Path
+
+import fitz
+
+from backend.config import BASE_DIR
+
+REPEAT = 3
+
+
+def _scan_dict(doc: fitz.Document, page: fitz.Page) -> int:
+    blocks = [b for b in page.get_text("dict")["blocks"] if b["type"] == 1]
+    return sum(len(b["image"]) for b in blocks)
+
+
+def _scan_images(doc: fitz.Document, page: fitz.Page) -> int:
+    total = 0
+    for item in page.get_images(full=True):
+        page.get_image_bbox(item)
+        total += len(doc.extract_image(item[0])["image"])
+    return total
+
+
+def _scan_image_info(doc: fitz.Document, page: fitz.Page) -> int:
+    return len(page.get_image_info())
+
+
+SCANNERS = {
+    "get_text(dict)": _scan_dict,
+    "get_images + bbox + extract": _scan_images,
+    "get_image_info (bboxes only)": _scan_image_info,
+}
+
+
+def _run(name: str, pdf_paths: list[str], conn) -> None:
+    scanner = SCANNERS[name]
+    pages = 0
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        for pdf_path in pdf_paths:
+            doc = fitz.open(pdf_path)
+            for page in doc:
+                scanner(doc, page)
+                pages += 1
+            doc.close()
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    conn.send((elapsed / pages * 1000, peak_kb / 1024))
+    conn.close()
+
+
+def main() -> None:
+    pdf_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else BASE_DIR / "samples"
+    pdf_paths = sorted(str(p) for p in pdf_dir.rglob("*.pdf"))
+    if not pdf_paths:
+        sys.exit(f"No PDFs found under {pdf_dir}")
+
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{len(pdf_paths)} PDFs, {REPEAT} passes")
+    print(f"{'scanner':<34}{'ms/page':>10}{'peak MiB':>10}")
+    for name in SCANNERS:
+        parent, child = ctx.Pipe()
+        proc = ctx.Process(target=_run, args=(name, pdf_paths, child))
+        proc.start()
+        ms_per_page, peak_mib = parent.recv()
+        proc.join()
+        print(f"{name:<34}{ms_per_page:>10.2f}{peak_mib:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
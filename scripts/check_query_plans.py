@@ -0,0 +1,166 @@
+"""Check that hot-path queries are served by indexes.
+
+Usage: python -m scripts.check_query_plans
+
+Builds an empty database in memory with the app's migrations, runs
+EXPLAIN QUERY PLAN for each query below and exits non-zero if any of
+them scans a table without an index. Tables a query is expected to read
+in full (e.g. listing every problem set) are named in its allowlist.
+"""
+
+from __future__ import annotations
+
+import re
+import sqlite3
+import sys
+
+from backend.database import apply_migrations
+
+# (name, sql, tables allowed to be scanned in full)
+QUERIES: list[tuple[str, str, set[str]]] = [
+    (
+        "list problem sets",
+        """SELECT id, name, created_at, chapter_count, total_problems
+           FROM problem_sets
+           ORDER BY created_at DESC""",
+        {"problem_sets"},
+    ),
+    (
+        "problem set chapters",
+        """SELECT id, name, sort_order, total_problems, missing_images
+           FROM chapters
+           WHERE problem_set_id = ?
+           ORDER BY sort_order""",
+        set(),
+    ),
+    (
+        "chapter problems",
+        "SELECT id, number, image_path FROM problems WHERE chapter_id = ? ORDER BY number",
+        set(),
+    ),
+    (
+        "problem set delete",
+        "DELETE FROM chapters WHERE problem_set_id = ?",
+        set(),
+    ),
+    (
+        "release images",
+        "SELECT DISTINCT image_path FROM problems "
+        "WHERE image_path IN (SELECT value FROM json_each(?))",
+        set(),
+    ),
+    (
+        "student's sets",
+        "SELECT id, student_id, title, created_at "
+        "FROM wrong_answer_sets WHERE student_id = ? ORDER BY created_at DESC",
+        set(),
+    ),
+    (
+        "recent sets",
+        """SELECT ws.id, ws.title, s.name
+           FROM wrong_answer_sets ws
+           JOIN students s ON s.id = ws.student_id
+           ORDER BY ws.created_at DESC
+           LIMIT 10""",
+        set(),
+    ),
+    (
+        "student delete",
+        "DELETE FROM wrong_answers WHERE wrong_answer_set_id IN "
+        "(SELECT id FROM wrong_answer_sets WHERE student_id = ?)",
+        set(),
+    ),
+    (
+        "set entries",
+        """SELECT wa.id, wa.chapter_id, c.name, ps.name
+           FROM wrong_answers wa
+           JOIN chapters c ON c.id = wa.chapter_id
+           JOIN problem_sets ps ON ps.id = c.problem_set_id
+           WHERE wa.wrong_answer_set_id = ?
+           ORDER BY ps.name, c.name""",
+        set(),
+    ),
+    (
+        "set entry numbers",
+        "SELECT chapter_id, number FROM wrong_answer_items "
+        "WHERE wrong_answer_set_id = ? ORDER BY chapter_id, number",
+        set(),
+    ),
+    (
+        "removed chapter wrong answers",
+        "DELETE FROM wrong_answers WHERE chapter_id = ?",
+        set(),
+    ),
+    (
+        "chapter wrong answer stats",
+        """SELECT i.number, COUNT(*), COUNT(DISTINCT ws.student_id)
+           FROM wrong_answer_items i
+           JOIN wrong_answer_sets ws ON ws.id = i.wrong_answer_set_id
+           WHERE i.chapter_id = ?
+           GROUP BY i.number ORDER BY i.number""",
+        set(),
+    ),
+    (
+        "pdf cache chapter invalidation",
+        "SELECT DISTINCT wrong_answer_set_id FROM wrong_answer_items WHERE chapter_id = ?",
+        set(),
+    ),
+    (
+        "pdf items",
+        """SELECT i.wrong_answer_set_id, i.number, p.image_path
+           FROM wrong_answer_items i
+           JOIN chapters c ON c.id = i.chapter_id
+           JOIN problem_sets ps ON ps.id = c.problem_set_id
+           LEFT JOIN problems p ON p.chapter_id = i.chapter_id AND p.number = i.number
+           WHERE i.wrong_answer_set_id IN (SELECT value FROM json_each(?))
+           ORDER BY i.wrong_answer_set_id, ps.name, c.name, i.number""",
+        set(),
+    ),
+    (
+        "history list",
+        """SELECT h.id, h.title, ps.name
+           FROM creation_history h
+           LEFT JOIN problem_sets ps ON h.problem_set_id = ps.id
+           ORDER BY h.created_at DESC""",
+        {"h"},
+    ),
+    (
+        "history cleanup",
+        "DELETE FROM creation_history WHERE created_at < ?",
+        set(),
+    ),
+]
+
+# "SCAN t" without an index; "SCAN t USING [COVERING] INDEX ..." and
+# json_each's "SCAN t VIRTUAL TABLE ..." are fine
+_FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+
+def _full_scans(conn: sqlite3.Connection, sql: str) -> list[str]:
+    params = (None,) * sql.count("?")
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    return [
+        match.group(1)
+        for _, _, _, detail in plan
+        if (match := _FULL_SCAN.match(detail))
+    ]
+
+
+def main() -> int:
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    apply_migrations(conn)
+
+    failures = 0
+    for name, sql, allowed in QUERIES:
+        scans = [table for table in _full_scans(conn, sql) if table not in allowed]
+        status = "FAIL" if scans else "ok"
+        detail = f" (full scan of {', '.join(scans)})" if scans else ""
+        print(f"{status:4}  {name}{detail}")
+        failures += bool(scans)
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())